@@ -7,24 +7,698 @@
 # Get your own BLING: https://unexpectedmaker.com/bling
 # More BLING On github: https://github.com/UnexpectedMaker/bling
 
+import sys
+import time
+import math
 import neopixel
 from adafruit_bitmap_font.bdf import BDF
 from adafruit_bitmap_font.pcf import PCF
-import adafruit_framebuf
-import struct
+import array
+
+# CircuitPython's Neopixel takes a slice assignment of flattened r,g,b values, which lets a
+# whole FrameBuffer be handed over in one call
+_FLAT_SLICES = sys.implementation.name == "circuitpython"
+
+class GlyphCache(object):
+    """
+    A cache of pre-rasterized glyphs for one Adafruit_Bitmap_Font (PCF or BDF) font object.
+
+    Each glyph is decoded once into a tuple of column bitmasks, one per pixel of advance
+    width, where bit n is set if row n of the font bounding box is lit.  Least recently
+    used glyphs are evicted once more than max_glyphs are cached.
+    """
+
+    def __init__(self, font, max_glyphs=128):
+        self._font = font
+        self.max_glyphs = max_glyphs
+        _, self.height, _, self._dy = font.get_bounding_box()
+        self._glyphs = {}
+        self._tick = 0
+
+    def glyphs(self, text):
+        """
+        Returns a list with the column bitmasks for each character in text, or None for
+        characters the font doesn't have.  Characters not yet cached are loaded in one
+        batch and rasterized.
+        """
+        cache = self._glyphs
+        missing = []
+        for c in text:
+            if c not in cache and c not in missing:
+                missing.append(c)
+        if missing:
+            self._font.load_glyphs("".join(missing))
+            for c in missing:
+                cache[c] = [0, self._rasterize(c)]
+        self._tick += 1
+        tick = self._tick
+        result = []
+        for c in text:
+            entry = cache[c]
+            entry[0] = tick
+            result.append(entry[1])
+        while len(cache) > self.max_glyphs:
+            oldest = None
+            for c in cache:
+                if oldest is None or cache[c][0] < cache[oldest][0]:
+                    oldest = c
+            del cache[oldest]
+        return result
+
+    def advances(self, text):
+        """
+        Returns the advance width in pixels of each character in text, 0 for characters the
+        font doesn't have, the same as glyphs() would give but without rasterizing anything.
+        """
+        cache = self._glyphs
+        missing = "".join(c for c in text if c not in cache)
+        if missing:
+            self._font.load_glyphs(missing)
+        result = []
+        for c in text:
+            entry = cache.get(c)
+            if entry is not None:
+                result.append(0 if entry[1] is None else len(entry[1]))
+            else:
+                glyph = self._font.get_glyph(ord(c))
+                result.append(max(glyph.width, glyph.shift_x) if glyph else 0)
+        return result
+
+    def clear(self):
+        """Empties the cache"""
+        self._glyphs = {}
+
+    def __len__(self):
+        return len(self._glyphs)
+
+    def _rasterize(self, c):
+        glyph = self._font.get_glyph(ord(c))
+        if not glyph:
+            return None
+        height = self.height
+        columns = [0] * max(glyph.width, glyph.shift_x)
+        for yg in range(height):
+            glyph_y = yg + (glyph.height - (height + self._dy)) + glyph.dy
+            if 0 <= glyph_y < glyph.height:
+                for i in range(glyph.width):
+                    if glyph.bitmap[i, glyph_y] > 0:
+                        columns[i] |= 1 << yg
+        return tuple(columns)
+
+
+class BinFont(object):
+    """
+    A circuitpython/micropython binary fixed size ".bin" font (i.e. - "font5x8.bin") read into
+    memory once, so drawing text doesn't need any file access.
+
+    The file is two bytes of width and height followed by font_width bytes per character,
+    each byte being one column of the character with bit 0 as the top row.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as font_file:
+            data = font_file.read()
+        self.font_width = data[0]
+        self.font_height = data[1]
+        self._data = memoryview(data)
+
+    def glyph(self, char):
+        """
+        Returns the column bytes for char as a memoryview, or None if the font doesn't have it.
+        """
+        start = 2 + ord(char) * self.font_width
+        if start + self.font_width > len(self._data):
+            return None
+        return self._data[start:start+self.font_width]
+
+
+class TextMetrics(object):
+    """
+    The size of some text as display.text() would draw it, from display.measure_text().
+
+    width is the advance width of the widest line in pixels (for ".bin" fonts that includes
+    the gap after the last character), height is the height of all the lines, and offsets
+    holds the x of each character of the text from the left of its line.
+    """
+
+    def __init__(self, width, height, offsets):
+        self.width = width
+        self.height = height
+        self.offsets = offsets
+
+
+class TextStrip(object):
+    """
+    A single line of text rendered once, offscreen, into r,g,b bytes per row so that any
+    window of it can be copied onto BLING without rasterizing the text again.  Make these
+    with display.text_strip() and draw them with display.strip() or a Scroller.
+
+    Rows are kept in display order: for rotation 2 each row is stored right to left, so a
+    window of a row is a single slice in Neopixel index order.  columns holds the bits of
+    each column of the text in the same order (bit n set where row n is text), which tells
+    the text from the background when the background is transparent.
+    """
+
+    def __init__(self, columns, height, color_foreground, color_background=None, reverse=False):
+        self.width = len(columns)
+        self.height = height
+        self.color_foreground = color_foreground
+        self.color_background = color_background
+        self.reversed = False
+        self.columns = list(columns)
+        foreground = _rgb_bytes(color_foreground)
+        background = _rgb_bytes(0 if color_background is None else color_background)
+        self.rows = []
+        for char_y in range(height):
+            bit = 1 << char_y
+            row = bytearray(background * self.width)
+            for i, line in enumerate(self.columns):
+                if line & bit:
+                    row[3*i:3*i+3] = foreground
+            self.rows.append(row)
+        if reverse:
+            self.reverse()
+
+    def reverse(self):
+        """Flips the stored order of the rows, in place"""
+        last = self.width - 1
+        for row in self.rows:
+            for i in range(self.width // 2):
+                j = last - i
+                row[3*i:3*i+3], row[3*j:3*j+3] = row[3*j:3*j+3], row[3*i:3*i+3]
+        self.columns.reverse()
+        self.reversed = not self.reversed
+
+
+class FrameBuffer(object):
+    """
+    An offscreen copy of the BLING led pixels kept in a bytearray as r,g,b bytes.  It is
+    written to like a Neopixel object (index and slice assignment, fill()), and dirty is set
+    whenever it is written to.
+    """
+
+    def __init__(self, num_pixels):
+        self.buf = bytearray(3*num_pixels)
+        self._num_pixels = num_pixels
+        self.dirty = True
+
+    def __len__(self):
+        return self._num_pixels
+
+    def __getitem__(self, index):
+        i = 3*index
+        return (self.buf[i], self.buf[i+1], self.buf[i+2])
+
+    def __setitem__(self, index, color):
+        buf = self.buf
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._num_pixels)
+            if isinstance(color, list):
+                if step != 1:
+                    for i, value in zip(range(start, stop, step), color):
+                        self[i] = value
+                elif color and color.count(color[0]) == len(color) >= stop-start:
+                    # All one color, like the lists the drawing functions write runs with
+                    if stop > start:
+                        buf[3*start:3*stop] = _rgb_bytes(color[0]) * (stop-start)
+                else:
+                    _pack_rgb(color[:stop-start], buf, 3*start)
+            elif step == 1:
+                if stop > start:
+                    buf[3*start:3*stop] = _rgb_bytes(color) * (stop-start)
+            else:
+                for i in range(start, stop, step):
+                    self[i] = color
+        elif type(color) is tuple:
+            i = 3*index
+            buf[i] = color[0]
+            buf[i+1] = color[1]
+            buf[i+2] = color[2]
+        elif isinstance(color, int):
+            i = 3*index
+            buf[i] = (color >> 16) & 0xFF
+            buf[i+1] = (color >> 8) & 0xFF
+            buf[i+2] = color & 0xFF
+        else:
+            i = 3*index
+            buf[i] = color[0]
+            buf[i+1] = color[1]
+            buf[i+2] = color[2]
+        self.dirty = True
+
+    def fill(self, color):
+        """Fill all pixels with a single color.   Like Neopixel .fill()"""
+        self.buf[:] = _rgb_bytes(color) * self._num_pixels
+        self.dirty = True
+
+    def touched(self, first, last):
+        """Called after pixels first to last (inclusive) were written straight into buf"""
+        self.dirty = True
+
+    def copy_to(self, pixels):
+        """Copies the whole buffer to a Neopixel object in one slice assignment"""
+        buf = self.buf
+        if isinstance(pixels, Panels):
+            pixels.copy_from(buf)
+        elif _FLAT_SLICES:
+            pixels[:] = buf
+        else:
+            pixels[:] = [(buf[i], buf[i+1], buf[i+2]) for i in range(0, len(buf), 3)]
+
+
+def _pack_rgb(colors, buf, offset):
+    """Writes a sequence of Neopixel-style colors into buf as r,g,b bytes starting at offset"""
+    i = offset
+    for value in colors:
+        if isinstance(value, int):
+            buf[i] = (value >> 16) & 0xFF
+            buf[i+1] = (value >> 8) & 0xFF
+            buf[i+2] = value & 0xFF
+        else:
+            buf[i] = value[0]
+            buf[i+1] = value[1]
+            buf[i+2] = value[2]
+        i += 3
+
+
+# Colors packed by _rgb_bytes() and handles from display.color(), kept so each is only done once
+_packed = {}
+_handles = {}
+_COLOR_CACHE_SIZE = 64
+
+def _rgb_bytes(color):
+    """Converts a Neopixel-style color (0xRRGGBB or (r,g,b)) to three r,g,b bytes"""
+    packed = _packed.get(color) if isinstance(color, (int, tuple)) else None
+    if packed is None:
+        if isinstance(color, int):
+            packed = bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+        else:
+            packed = bytes((color[0], color[1], color[2]))
+        if isinstance(color, (int, tuple)):
+            if len(_packed) >= _COLOR_CACHE_SIZE:
+                _packed.clear()
+            _packed[color] = packed
+    return packed
+
+
+def _color_handle(color):
+    """Returns an r,g,b tuple for a Neopixel-style color, reusing recent ones, see display.color()"""
+    key = color if isinstance(color, (int, tuple)) else tuple(color)
+    handle = _handles.get(key)
+    if handle is None:
+        handle = tuple(_rgb_bytes(key))
+        if len(_handles) >= _COLOR_CACHE_SIZE:
+            _handles.clear()
+        _handles[key] = handle
+        _handles[handle] = handle
+    return handle
+
+
+class RGB565Swapped(object):
+    """
+    Converts RGB565_Swapped pixel values, like gifio bitmaps use, to RGB888 colors (as
+    0xRRGGBB ints) with two 256 entry lookup tables, one for each byte of the value, instead
+    of shifting and masking every pixel.  It can be indexed like a palette, and is what
+    bitmap_tile() uses when palette is None.
+    """
+
+    def __init__(self):
+        # In the swapped value the low byte holds red and the top of green, the high byte
+        # the bottom of green and blue.
+        self.low = array.array("L", [((v & 0xF8) << 16) | ((v & 0x07) << 13) for v in range(256)])
+        self.high = array.array("L", [((v & 0xE0) << 5) | ((v & 0x1F) << 3) for v in range(256)])
+
+    def __getitem__(self, value):
+        return self.low[value & 0xFF] | self.high[value >> 8]
+
+    def convert(self, values):
+        """Returns a list of RGB888 colors for a sequence of RGB565_Swapped values"""
+        low = self.low
+        high = self.high
+        return [low[v & 0xFF] | high[v >> 8] for v in values]
+
+
+_rgb565_swapped = None
+
+def _rgb565_swapped_converter():
+    """Returns the shared RGB565Swapped converter, building its tables on first use"""
+    global _rgb565_swapped
+    if _rgb565_swapped is None:
+        _rgb565_swapped = RGB565Swapped()
+    return _rgb565_swapped
+
+
+class Frame(object):
+    """
+    An image converted once to r,g,b bytes and laid out in Neopixel order for one rotation,
+    so drawing it is one slice copy per row (rotation 0,2) or column (rotation 1,3).  Make
+    these with display.prerender() and draw them with display.draw_frame().
+    """
+
+    def __init__(self, width, height, rotation, data):
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.data = data
+
+
+class DisplayList(object):
+    """
+    Drawing recorded with display.record() and display.end_record(), compiled into spans of
+    pixels that run along Neopixel index order for the rotation it was recorded in.  Each
+    span is a line (row for rotation 0,2, column for rotation 1,3), a start and length along
+    it relative to the recording origin, and its colors as r,g,b bytes, so replaying it with
+    display.replay() is a clip and a slice copy per span.
+    """
+
+    def __init__(self, rotation, spans, data):
+        self.rotation = rotation
+        self.spans = spans
+        self.data = data
+
+
+class _Recorder(object):
+    """Stands in for the Neopixel object while display.record() is active, keeping every write"""
+
+    def __init__(self, num_pixels):
+        self._num_pixels = num_pixels
+        self.pixels = {}
+
+    def __len__(self):
+        return self._num_pixels
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            indexes = range(*index.indices(self._num_pixels))
+            if isinstance(color, (bytes, bytearray, memoryview)):
+                for n, i in enumerate(indexes):
+                    self.pixels[i] = (color[3*n], color[3*n+1], color[3*n+2])
+            elif isinstance(color, list):
+                for i, value in zip(indexes, color):
+                    self.pixels[i] = value
+            else:
+                for i in indexes:
+                    self.pixels[i] = color
+        else:
+            self.pixels[index] = color
+
+    def fill(self, color):
+        self[:] = color
+
+
+class _Counters(object):
+    """The counts kept by display.instrument()"""
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.calls = {}
+        self.time_ns = {}
+        self.reset()
+
+    def reset(self):
+        """Sets everything back to zero.  The dictionaries are kept, the timed wrappers hold on to them"""
+        self.pixel_writes = 0
+        self.write_calls = 0
+        self.shows = 0
+        self.bytes_pushed = 0
+        for name in self.calls:
+            self.calls[name] = 0
+            self.time_ns[name] = 0
+
+    def timed(self, name, method):
+        """Returns method wrapped to add up its calls and time under name"""
+        calls = self.calls
+        time_ns = self.time_ns
+        calls[name] = 0
+        time_ns[name] = 0
+        def wrapper(*args, **kwargs):
+            start = time.monotonic_ns()
+            result = method(*args, **kwargs)
+            elapsed = time.monotonic_ns() - start
+            calls[name] += 1
+            time_ns[name] += elapsed
+            if self.hook is not None:
+                self.hook(name, elapsed)
+            return result
+        return wrapper
+
+
+class _CountingPixels(object):
+    """Stands in for the Neopixel object while display.instrument() is on, counting pixel writes"""
+
+    def __init__(self, pixels, counters):
+        self.pixels = pixels
+        self._counters = counters
+
+    def __len__(self):
+        return len(self.pixels)
+
+    def __getitem__(self, index):
+        return self.pixels[index]
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            self._counters.pixel_writes += len(range(*index.indices(len(self.pixels))))
+        else:
+            self._counters.pixel_writes += 1
+        self._counters.write_calls += 1
+        self.pixels[index] = color
+
+    def fill(self, color):
+        self._counters.pixel_writes += len(self.pixels)
+        self._counters.write_calls += 1
+        self.pixels.fill(color)
+
+    def show(self):
+        self.pixels.show()
+
+
+class _CountingFrameBuffer(FrameBuffer):
+    """A FrameBuffer counting pixel writes while display.instrument() is on, sharing the buffer of another"""
+
+    def __init__(self, framebuffer, counters):
+        self.buf = framebuffer.buf
+        self._num_pixels = len(framebuffer)
+        self.dirty = framebuffer.dirty
+        self._counters = counters
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            self._counters.pixel_writes += len(range(*index.indices(self._num_pixels)))
+        else:
+            self._counters.pixel_writes += 1
+        self._counters.write_calls += 1
+        FrameBuffer.__setitem__(self, index, color)
+
+    def fill(self, color):
+        self._counters.pixel_writes += self._num_pixels
+        self._counters.write_calls += 1
+        FrameBuffer.fill(self, color)
+
+
+class Panels(object):
+    """
+    Joins several UM BLING boards into one bigger Neopixel-like object that display can draw
+    on as a single canvas, for walls of boards.  Each Neopixel object can be one board or a
+    chain of boards on the same strip; the boards are taken in order and placed left to right,
+    then top to bottom, columns boards across, all turned the same way as a single board at
+    rotation 0.  display() rotates the whole wall like it rotates one board.
+
+    A lookup table built once gives the board and Neopixel index for every pixel of the wall,
+    so writes only go to the boards they land on, and show() only updates the Neopixel
+    objects whose boards were drawn on since the last show().
+
+    :param pixels: a Neopixel object, or a list of them
+    :param columns: how many boards across the wall is
+    """
+
+    def __init__(self, pixels, columns=1):
+        if not isinstance(pixels, (list, tuple)):
+            pixels = [pixels]
+        panel_width, panel_height = display.pixel_size()
+        panel_pixels = panel_width * panel_height
+        # Each board as (Neopixel object number, first Neopixel index)
+        boards = []
+        for number, strip in enumerate(pixels):
+            for offset in range(0, len(strip) - panel_pixels + 1, panel_pixels):
+                boards.append((number, offset))
+        if not boards or len(boards) % columns:
+            raise ValueError("Need a whole number of rows of {} boards, have {}".format(columns, len(boards)))
+        self._strips = list(pixels)
+        self._width = panel_width * columns
+        self._height = panel_height * (len(boards) // columns)
+        self._num_pixels = self._width * self._height
+        self._panel_width = panel_width
+        self._board_strip = [number for number, offset in boards]
+        self._board_pixels = [self._strips[number] for number, offset in boards]
+        self._panel = array.array("B", bytes(self._num_pixels))
+        self._index = array.array("H" if max(len(strip) for strip in pixels) <= 65536 else "L",
+                                  range(self._num_pixels))
+        for board, (number, offset) in enumerate(boards):
+            left = (board % columns) * panel_width
+            top = (board // columns) * panel_height
+            for y in range(panel_height):
+                i = left + (top+y)*self._width
+                for x in range(panel_width):
+                    self._panel[i+x] = board
+                    self._index[i+x] = offset + x + y*panel_width
+        self._changed = [False] * len(self._strips)
+        self._sent = None
+
+    @property
+    def width(self):
+        """Width of the wall in pixels, at rotation 0"""
+        return self._width
+
+    @property
+    def height(self):
+        """Height of the wall in pixels, at rotation 0"""
+        return self._height
+
+    def __len__(self):
+        return self._num_pixels
+
+    def _runs(self, start, stop):
+        """
+        Yields (board, first Neopixel index, count) runs covering wall pixels start to stop-1.
+        A row of one board is always a single run, and rows that follow on in the same
+        Neopixel object are joined together.
+        """
+        panel = self._panel
+        index = self._index
+        panel_width = self._panel_width
+        while start < stop:
+            board = panel[start]
+            first = index[start]
+            end = min(stop, start - start % panel_width + panel_width)
+            while end < stop and panel[end] == board and index[end] == first + end - start:
+                end = min(stop, end + panel_width)
+            yield board, first, end - start
+            start = end
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._num_pixels)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            values = []
+            for board, first, count in self._runs(start, stop):
+                values.extend(self._board_pixels[board][first:first+count])
+            return values
+        return self._board_pixels[self._panel[index]][self._index[index]]
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._num_pixels)
+            if step != 1:
+                for i, value in zip(range(start, stop, step), color):
+                    self[i] = value
+                return
+            done = 0
+            for board, first, count in self._runs(start, stop):
+                if isinstance(color, list):
+                    self._board_pixels[board][first:first+count] = color[done:done+count]
+                elif isinstance(color, (bytes, bytearray, memoryview)):
+                    # Flat r,g,b bytes, like _write_rgb() sends on CircuitPython
+                    data = color[3*done:3*(done+count)]
+                    if not _FLAT_SLICES:
+                        data = [(data[i], data[i+1], data[i+2]) for i in range(0, len(data), 3)]
+                    self._board_pixels[board][first:first+count] = data
+                else:
+                    self._board_pixels[board][first:first+count] = [color]*count
+                self._changed[self._board_strip[board]] = True
+                done += count
+        else:
+            board = self._panel[index]
+            self._board_pixels[board][self._index[index]] = color
+            self._changed[self._board_strip[board]] = True
+
+    def fill(self, color):
+        """Fill every board with a single color.   Like Neopixel .fill()"""
+        for strip in self._strips:
+            strip.fill(color)
+        self._changed = [True] * len(self._strips)
+
+    def copy_from(self, buf):
+        """
+        Copies a FrameBuffer's r,g,b bytes to the boards.  Only the runs that are different
+        from the last copy are written, so boards that didn't change aren't touched and
+        aren't shown.
+        """
+        sent = self._sent
+        if sent is None:
+            sent = self._sent = bytearray(len(buf))
+            stale = True
+        else:
+            stale = False
+        start = 0
+        for board, first, count in self._runs(0, self._num_pixels):
+            i0 = 3*start
+            i1 = 3*(start+count)
+            start += count
+            if not stale and buf[i0:i1] == sent[i0:i1]:
+                continue
+            sent[i0:i1] = buf[i0:i1]
+            if _FLAT_SLICES:
+                self._board_pixels[board][first:first+count] = buf[i0:i1]
+            else:
+                self._board_pixels[board][first:first+count] = [(buf[i], buf[i+1], buf[i+2]) for i in range(i0, i1, 3)]
+            self._changed[self._board_strip[board]] = True
+
+    def show(self):
+        """Updates only the Neopixel objects that were written to since the last show()"""
+        for number, strip in enumerate(self._strips):
+            if self._changed[number]:
+                self._changed[number] = False
+                strip.show()
+
 
 class display(object):
-    """A Class object to interface with the 40x8 led matrix on UM BLING"""
+    """
+    A Class object to interface with the 40x8 led matrix on UM BLING, or with a wall of
+    them when given a Panels object instead of a Neopixel object
+    """
 
-    def __init__(self, matrix: neopixel.NeoPixel, rotation=2):
+    def __init__(self, matrix: neopixel.NeoPixel, rotation=2, glyph_cache_size=128, framebuffer=False,
+                 double_buffer=False):
         # print("I'm a new displsay")
-        self._width, self._height = self.pixel_size()
+        if isinstance(matrix, Panels):
+            self._width, self._height = matrix.width, matrix.height
+        else:
+            self._width, self._height = self.pixel_size()
         # self._height = 8
         self._num_pixels = self._width * self._height
-        if rotation not in [0,1,2,3]:
-            raise ValueError("Rotation must be one of 0,1,2,3")
-        self._rotation = rotation
-        self._matrix = matrix
+        # Drawing always goes to self._matrix.  With a framebuffer that's an offscreen FrameBuffer
+        # (the back buffer) and show() copies the front buffer to the Neopixel object only when
+        # it has changed.  Without double buffering the front and back buffer are the same one.
+        self._pixels = matrix
+        if framebuffer or double_buffer:
+            self._matrix = FrameBuffer(self._num_pixels)
+            if double_buffer:
+                self._front = FrameBuffer(self._num_pixels)
+            else:
+                self._front = self._matrix
+            self._sent = bytearray(3*self._num_pixels)
+            self._sent_valid = False
+        else:
+            self._front = None
+            self._matrix = matrix
+        self.rotation = rotation
+        self.glyph_cache_size = glyph_cache_size
+        self._glyph_caches = {}
+        self._bin_fonts = {}
+        self._frames = 0
+        self._recording = None
+        self._counters = None
+        self._shapes = {}
+        self._span_color = None
+        self._spans = {}
+        self._text_metrics = {}
+        self._correction = None
+        self._corrected = None
+        self._gamma = 1.0
+        self._brightness = 1.0
+        self._white_balance = (1.0, 1.0, 1.0)
 
     @staticmethod
     def pixel_size():
@@ -40,8 +714,101 @@ class display(object):
 
     @rotation.setter
     def rotation(self,value):
-        """Set the rotation of the BLING display (0,1,2,3)"""
+        """
+        Set the rotation of the BLING display (0,1,2,3).  Clip rectangles and origins from
+        push_clip() are kept on the same leds, in the new rotation's coordinates.
+        """
+        if value not in [0,1,2,3]:
+            raise ValueError("Rotation must be one of 0,1,2,3")
+        # Any clip stack, with the current clip on top, as opposite corners in the led grid.
+        # A translated origin goes with the rectangle from it to the far corner of its clip,
+        # whose top left is the origin again in the new rotation.
+        clips = []
+        if getattr(self, "_clip_stack", None):
+            last_origin = None
+            for (x0, y0, x1, y1), origin_x, origin_y in self._clip_stack + [(self._clip, self._origin_x, self._origin_y)]:
+                empty = x0 >= x1 or y0 >= y1
+                if empty:
+                    x1, y1 = x0+1, y0+1
+                if (origin_x, origin_y) == last_origin:
+                    origin = None
+                else:
+                    origin = (self._to_grid(origin_x, origin_y), self._to_grid(max(x1, origin_x+1)-1, max(y1, origin_y+1)-1))
+                    last_origin = (origin_x, origin_y)
+                clips.append((self._to_grid(x0, y0), self._to_grid(x1-1, y1-1), origin, empty))
         self._rotation = value
+        self._build_index_map()
+        if clips:
+            stack = []
+            for corner, other, origin, empty in clips:
+                x0, y0, x1, y1 = self._grid_rect(corner, other)
+                if empty:
+                    x1, y1 = x0, y0
+                if origin is not None:
+                    origin_x, origin_y = self._grid_rect(*origin)[:2]
+                stack.append(((x0, y0, x1, y1), origin_x, origin_y))
+            self._clip, self._origin_x, self._origin_y = stack.pop()
+            self._clip_stack = stack
+
+    def _grid_rect(self, corner, other):
+        """Returns x0,y0,x1,y1 in the current rotation of the led grid rectangle with these opposite corners"""
+        x0, y0 = self._from_grid(*corner)
+        x1, y1 = self._from_grid(*other)
+        return min(x0, x1), min(y0, y1), max(x0, x1) + 1, max(y0, y1) + 1
+
+    def _to_grid(self, x, y):
+        """Returns the column and row in the led grid of viewport x,y in the current rotation"""
+        if self._rotation == 0:
+            return x, y
+        elif self._rotation == 2:
+            return self._width-1-x, self._height-1-y
+        elif self._rotation == 1:
+            return self._width-1-y, x
+        return y, self._height-1-x
+
+    def _from_grid(self, column, row):
+        """Returns the viewport x,y in the current rotation of a column and row in the led grid"""
+        if self._rotation == 0:
+            return column, row
+        elif self._rotation == 2:
+            return self._width-1-column, self._height-1-row
+        elif self._rotation == 1:
+            return row, self._width-1-column
+        return self._height-1-row, column
+
+    def _build_index_map(self):
+        """
+        Precompute the x,y to Neopixel index lookup table for the current rotation.  The table
+        is laid out row by row in viewport coordinates, so the index for (x,y) is at
+        x + y*view_width.  Rebuilt whenever the rotation changes.
+        """
+        if self._rotation in [0,2]:
+            view_width, view_height = self._width, self._height
+        else:
+            view_width, view_height = self._height, self._width
+        last_x = self._width - 1
+        last_y = self._height - 1
+        index_map = array.array("H", range(self._num_pixels))
+        i = 0
+        for y in range(view_height):
+            for x in range(view_width):
+                if self._rotation == 2:
+                    index_map[i] = (last_x-x) + (last_y-y)*self._width
+                elif self._rotation == 0:
+                    index_map[i] = x + y*self._width
+                elif self._rotation == 1:
+                    index_map[i] = (last_x-y) + x*self._width
+                else:
+                    index_map[i] = y + (last_y-x)*self._width
+                i += 1
+        self._view_width = view_width
+        self._view_height = view_height
+        self._index_map = index_map
+        # Clip rectangle (x0,y0,x1,y1) and drawing origin, both in absolute viewport coordinates
+        self._clip = (0, 0, view_width, view_height)
+        self._origin_x = 0
+        self._origin_y = 0
+        self._clip_stack = []
 
     @property
     def num_pixels(self):
@@ -54,10 +821,7 @@ class display(object):
         Returns the viewport width of led pixels on BLING, accounting
         for rotation mode
         """
-        if self._rotation in [0,2]:
-            return self._width
-        else:
-            return self._height
+        return self._view_width
 
     @property
     def height(self):
@@ -65,60 +829,434 @@ class display(object):
         Returns the viewport height of led pixels on BLING, accounting
         for rotation mode
         """
-        if self._rotation in [0,2]:
-            return self._height
-        else:
-            return self._width
+        return self._view_height
+
+    def push_clip(self, x, y, w, h, translate=False):
+        """
+        Limits drawing to the rectangle x,y,w,h (in current coordinates) until pop_clip().
+        The new clip is the part of the rectangle inside the current clip, so clips nest.
+        Every drawing function clips its whole shape once against it before drawing anything.
+
+        :param x,y: top left of the clip rectangle
+        :param w,h: width and height of the clip rectangle
+        :param translate: if True, x,y also becomes the new 0,0 for drawing, making the clip
+                          rectangle a viewport that things can be drawn into without knowing where it is
+        """
+        origin_x, origin_y = self._origin_x, self._origin_y
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += origin_x
+        y += origin_y
+        x0 = max(clip_x0, x)
+        y0 = max(clip_y0, y)
+        self._clip_stack.append((self._clip, origin_x, origin_y))
+        self._clip = (x0, y0, max(x0, min(clip_x1, x+w)), max(y0, min(clip_y1, y+h)))
+        if translate:
+            self._origin_x = x
+            self._origin_y = y
+
+    def pop_clip(self):
+        """Restores the clip rectangle and origin from before the last push_clip()"""
+        if not self._clip_stack:
+            raise RuntimeError("No clip to pop")
+        self._clip, self._origin_x, self._origin_y = self._clip_stack.pop()
+
+    @property
+    def clip_rect(self):
+        """Returns the current clip rectangle as x,y,w,h in current coordinates"""
+        x0, y0, x1, y1 = self._clip
+        return (x0-self._origin_x, y0-self._origin_y, x1-x0, y1-y0)
+
+    def _glyph_cache(self, font):
+        """Returns the GlyphCache for a PCF/BDF font object, creating it on first use"""
+        cache = self._glyph_caches.get(font)
+        if cache is None:
+            cache = GlyphCache(font, self.glyph_cache_size)
+            self._glyph_caches[font] = cache
+        return cache
+
+    def _bin_font(self, filename):
+        """Returns the BinFont for a ".bin" font filename, loading it on first use"""
+        font = self._bin_fonts.get(filename)
+        if font is None:
+            font = BinFont(filename)
+            self._bin_fonts[filename] = font
+        return font
 
     def xy_to_array(self,x,y):
         """
         Function that converts an x,y coordinate into a Neopixel array index.
         Accounts for rotation mode.  Top left is always x=0,y=0
 
-        Will return None if pixel is outside BLING array area.
-        You may have to test separately if (x,y) is in the bounds of the display
-        depending on rotation. We don't do it here because an every-pixel
-        operation really slows things down.
+        Will return None if pixel is outside the BLING viewport.  The index comes from
+        a lookup table precomputed for the current rotation, so there is no per-pixel
+        rotation math.  Ignores the clip rectangle and origin from push_clip().
         """
-        if self._rotation == 2:
-            loc = (39-x) + (7-y)*40
-        elif self._rotation == 0:
-            loc = x+y*40
-        elif self._rotation == 1:
-            loc = (39-y) + x*40
-        elif self._rotation == 3:
-            loc = y+(7-x)*40
-        if 0<= loc <= 319:
-            return loc
+        if 0 <= x < self._view_width and 0 <= y < self._view_height:
+            return self._index_map[x + y*self._view_width]
+        return None
+
+    @property
+    def dirty(self):
+        """
+        True if the pixels have been drawn to since the last show() (or swap() when double
+        buffered).  Always True without a framebuffer, since there's nothing to compare against.
+        """
+        if self._front is None:
+            return True
+        return self._matrix.dirty
+
+    @property
+    def frames(self):
+        """Returns the number of frames actually written to BLING by show()"""
+        return self._frames
+
+    def color(self, value):
+        """
+        Returns a color handle for value to draw with, for colors used over and over.  The
+        handle is an r,g,b tuple, so it works anywhere a color does and compares equal to
+        any other handle for the same color (it isn't always the same object, the cache of
+        recent colors is emptied when it fills up).  Tuples are the quickest colors for the
+        framebuffer and Neopixel objects to take, and the packed r,g,b bytes the framebuffer
+        fills with are kept for recent colors instead of worked out on every write.
+
+        :param value: 0xRRGGBB, (r,g,b) or an existing handle
+        """
+        return _color_handle(value)
+
+    def set_correction(self, gamma=1.0, brightness=1.0, white_balance=(1.0, 1.0, 1.0)):
+        """
+        Sets up gamma, brightness and white balance correction, applied by show() as the frame
+        is copied from the framebuffer to the Neopixels.  Each color channel gets a 256 entry
+        lookup table built here, so changing them costs one table rebuild and every frame just
+        looks values up.  Leave the Neopixel brightness at 1.0 when using this.  Needs
+        framebuffer=True or double_buffer=True.
+
+        :param gamma: output is (value/255)**gamma, 2.2 or so makes dim levels look smoother
+        :param brightness: 0.0 to 1.0, scales all three channels
+        :param white_balance: r,g,b scales, to even out the color of the leds
+        """
+        if self._front is None:
+            raise ValueError("Correction needs framebuffer=True or double_buffer=True")
+        brightness = min(max(brightness, 0.0), 1.0)
+        self._gamma = gamma
+        self._brightness = brightness
+        self._white_balance = tuple(white_balance)
+        if gamma == 1.0 and brightness == 1.0 and self._white_balance == (1.0, 1.0, 1.0):
+            self._correction = None
+            self._corrected = None
         else:
+            curve = [(value/255) ** gamma * brightness * 255 for value in range(256)]
+            self._correction = tuple(bytearray(min(255, int(level * scale + 0.5)) for level in curve)
+                                     for scale in self._white_balance)
+            if self._corrected is None:
+                self._corrected = FrameBuffer(self._num_pixels)
+        # The frame on BLING was corrected with the old tables, so send it again
+        self._sent_valid = False
+        self._front.dirty = True
+
+    @property
+    def brightness(self):
+        """
+        Brightness (0.0 to 1.0) from set_correction().  Setting it rebuilds the correction
+        tables keeping the gamma and white balance.
+        """
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, value):
+        self.set_correction(self._gamma, value, self._white_balance)
+
+    def _correct(self, buf):
+        """Returns a FrameBuffer holding buf with the correction tables applied to every byte"""
+        red, green, blue = self._correction
+        out = self._corrected.buf
+        for i in range(0, len(buf), 3):
+            out[i] = red[buf[i]]
+            out[i+1] = green[buf[i+1]]
+            out[i+2] = blue[buf[i+2]]
+        return self._corrected
+
+    # The drawing functions that instrument() times
+    _PROFILED = ("show", "present", "swap", "clear", "fill", "scroll", "setpixel", "text", "strip",
+                 "bitmap", "bitmap_tile", "prerender", "draw_frame", "replay", "line", "polyline",
+                 "lines", "hline", "vline", "hline_aligned", "vline_aligned", "hline_direct",
+                 "vline_direct", "circle", "fill_circle", "ellipse", "fill_ellipse", "round_rect",
+                 "fill_rect", "rect")
+
+    def instrument(self, enable=True, hook=None):
+        """
+        Turns instrumentation on or off.  While it's on, pixel writes, the writes (single
+        pixels, slices or fills) they took, show() calls and bytes pushed to BLING are counted,
+        and the calls and time of each drawing function are added up (including the time of
+        drawing functions it calls, so rect() includes its hline()s).  It works by swapping in
+        counting versions of the drawing functions and the Neopixel or framebuffers, so when
+        it's off nothing is counted and nothing is slowed down.
+
+        :param enable: True to turn instrumentation on, False to turn it off again.  Neither can
+                       be done between record() and end_record()
+        :param hook: if not None, called with the name and time in nanoseconds of every timed call
+        """
+        if not enable:
+            if self._counters is not None:
+                if self._recording is not None:
+                    raise RuntimeError("Can't stop instrumenting while recording")
+                for name in self._PROFILED + ("_write_rgb",):
+                    delattr(self, name)
+                self._count_targets(None)
+                self._counters = None
+            return
+        if self._counters is not None:
+            self._counters.hook = hook
+            return
+        if self._recording is not None:
+            raise RuntimeError("Can't start instrumenting while recording")
+        counters = _Counters(hook)
+        write_rgb = self._write_rgb
+        scroll = self.scroll
+        show = self.show
+        def counted_write_rgb(index, data, offset, n):
+            # Writes straight into a framebuffer's bytes aren't seen by _CountingFrameBuffer
+            if isinstance(self._matrix, FrameBuffer):
+                counters.pixel_writes += n
+                counters.write_calls += 1
+            write_rgb(index, data, offset, n)
+        def counted_scroll(dx, dy, fill=None):
+            if isinstance(self._matrix, FrameBuffer):
+                x0, y0, x1, y1 = self._clip
+                counters.pixel_writes += max(0, x1-x0-abs(dx)) * max(0, y1-y0-abs(dy))
+                # One copy per row of the led grid that's moved
+                if self._rotation in [0,2]:
+                    rows, columns, dr = y1-y0, x1-x0-abs(dx), dy
+                else:
+                    rows, columns, dr = x1-x0, y1-y0-abs(dy), dx
+                if columns > 0:
+                    counters.write_calls += max(0, rows-abs(dr))
+            scroll(dx, dy, fill)
+        def counted_show():
+            updated = show()
+            counters.shows += 1
+            if updated:
+                counters.bytes_pushed += getattr(self._pixels, "bpp", 3) * self._num_pixels
+            return updated
+        self._write_rgb = counted_write_rgb
+        self.scroll = counted_scroll
+        self.show = counted_show
+        for name in self._PROFILED:
+            setattr(self, name, counters.timed(name, getattr(self, name)))
+        self._count_targets(counters)
+        self._counters = counters
+
+    def _count_targets(self, counters):
+        """Swaps the Neopixel object or framebuffers for counting ones sharing the same pixels, or back"""
+        if self._front is None:
+            if counters is not None:
+                self._pixels = _CountingPixels(self._pixels, counters)
+            else:
+                self._pixels = self._pixels.pixels
+            self._matrix = self._pixels
+            return
+        def swapped(framebuffer):
+            if counters is not None:
+                return _CountingFrameBuffer(framebuffer, counters)
+            plain = FrameBuffer(len(framebuffer))
+            plain.buf = framebuffer.buf
+            plain.dirty = framebuffer.dirty
+            return plain
+        front = swapped(self._front)
+        self._matrix = front if self._matrix is self._front else swapped(self._matrix)
+        self._front = front
+
+    @property
+    def instrumented(self):
+        """True while instrument() is on"""
+        return self._counters is not None
+
+    def snapshot(self):
+        """
+        Returns a dictionary of the counts since instrument() or reset_counters(): pixel_writes,
+        write_calls, shows, bytes_pushed, and for each drawing function used, calls and
+        time (in seconds) in "calls" and "time".  Returns None if instrumentation is off.
+        """
+        counters = self._counters
+        if counters is None:
             return None
+        used = [name for name in counters.calls if counters.calls[name]]
+        return {
+            "pixel_writes": counters.pixel_writes,
+            "write_calls": counters.write_calls,
+            "shows": counters.shows,
+            "bytes_pushed": counters.bytes_pushed,
+            "calls": dict((name, counters.calls[name]) for name in used),
+            "time": dict((name, counters.time_ns[name] / 1e9) for name in used),
+        }
+
+    def reset_counters(self):
+        """Sets all the instrumentation counts back to zero"""
+        if self._counters is not None:
+            self._counters.reset()
 
     def show(self):
         """
         Write the led pixel values to BLING and update display.  Like Neopixel .show()
+
+        With a framebuffer, the frame is only written if it has changed since the last show(),
+        and is copied to the Neopixel object in one go.  When double buffered this shows the
+        front buffer, which is the last frame handed over by swap().  Returns True if BLING
+        was updated.
+        """
+        front = self._front
+        if front is not None:
+            if not front.dirty:
+                return False
+            front.dirty = False
+            if self._sent_valid and front.buf == self._sent:
+                return False
+            self._sent[:] = front.buf
+            self._sent_valid = True
+            if self._correction is not None:
+                self._correct(front.buf).copy_to(self._pixels)
+            else:
+                front.copy_to(self._pixels)
+        self._frames += 1
+        self._pixels.show()
+        return True
+
+    def swap(self, copy=False):
         """
-        self._matrix.show()
+        When double buffered, hands the finished back buffer over to be shown and makes the old
+        front buffer the one drawn on next, so the next frame can be started straight away and
+        show() never sends a half drawn frame.  Does nothing otherwise.
+
+        :param copy: if True, the new back buffer starts as a copy of the frame just finished,
+                     for scenes that only redraw what changes.  Otherwise it holds the frame
+                     before that.
+        """
+        if self._front is None or self._front is self._matrix:
+            return
+        back = self._front
+        self._front = self._matrix
+        self._front.dirty = True
+        if copy:
+            back.buf[:] = self._front.buf
+        back.dirty = False
+        self._matrix = back
+
+    def present(self):
+        """
+        Finishes the frame being drawn and writes it to BLING: swap() then show().  Without
+        double buffering this is the same as show().  Returns True if BLING was updated.
+        """
+        self.swap()
+        return self.show()
+
+    async def show_async(self):
+        """
+        Awaitable show() for use with asyncio.  The Neopixel write itself still blocks while
+        the data goes out, so this lets other tasks run straight after it.  With a framebuffer
+        an unchanged frame isn't written at all.  Returns True if BLING was updated.
+        """
+        import asyncio
+        result = self.show()
+        await asyncio.sleep(0)
+        return result
+
+    async def present_async(self):
+        """Awaitable present(), see show_async()"""
+        self.swap()
+        return await self.show_async()
 
     def clear(self):
         """
         Always clears all BLING led pixels to black and updates display
         """
         self._matrix.fill(0x000000)
+        if self._front is not None and self._front is not self._matrix:
+            self._front.fill(0x000000)
         self.show()
 
     def fill(self,color):
         """
         Fill BLING led pixels with a single color.   Like Neopixel .fill()
+        With a clip rectangle from push_clip() only the clip rectangle is filled.
         """
-        self._matrix.fill(color)
+        x0, y0, x1, y1 = self._clip
+        if (x0, y0, x1, y1) == (0, 0, self._view_width, self._view_height):
+            self._matrix.fill(color)
+        else:
+            self.fill_rect(x0-self._origin_x, y0-self._origin_y, x1-x0, y1-y0, color)
+
+    def scroll(self, dx, dy, fill=None):
+        """
+        Moves everything on BLING by dx,dy pixels (in viewport directions, so accounting for
+        rotation) without redrawing it.  Pixels are moved a whole row of the 40 pixel wide
+        led grid at a time with slice copies.  Use this for tickers and waterfalls and just
+        draw the newly uncovered column or row.  With a clip rectangle from push_clip() only
+        the pixels inside it move.  Raises RuntimeError between record() and end_record().
+
+        :param dx,dy: distance to move, positive is right and down
+        :param fill: if a color, the uncovered area is filled with it.  If None it's left as it was.
+        """
+        if self._recording is not None:
+            raise RuntimeError("Can't scroll while recording")
+        # Movement in the physical led grid, columns along the 40 pixel axis and rows along the 8
+        if self._rotation == 0:
+            dc, dr = dx, dy
+        elif self._rotation == 2:
+            dc, dr = -dx, -dy
+        elif self._rotation == 1:
+            dc, dr = -dy, dx
+        else:
+            dc, dr = dy, -dx
+        # Only the part of the led grid under the clip rectangle moves
+        x0, y0, x1, y1 = self._clip
+        if x0 >= x1 or y0 >= y1:
+            return
+        grid_width = self._width
+        first = self._index_map[x0 + y0*self._view_width]
+        last = self._index_map[x1-1 + (y1-1)*self._view_width]
+        column0 = min(first % grid_width, last % grid_width)
+        row0 = min(first // grid_width, last // grid_width)
+        row1 = max(first // grid_width, last // grid_width) + 1
+        columns = max(first % grid_width, last % grid_width) + 1 - column0
+        matrix = self._matrix
+        buf = matrix.buf if isinstance(matrix, FrameBuffer) else None
+        n = columns - abs(dc)
+        src = max(0, -dc)
+        dst = max(0, dc)
+        if dc > 0:
+            exposed = (0, min(columns, dc))
+        else:
+            exposed = (max(0, columns+dc), columns)
+        # Work away from the direction of movement so rows are read before they're overwritten
+        if dr > 0:
+            rows = range(row1-1, row0-1, -1)
+        else:
+            rows = range(row0, row1)
+        for row in rows:
+            base = row*grid_width + column0
+            source = row - dr
+            if n > 0 and row0 <= source < row1:
+                start = source*grid_width + column0 + src
+                if buf is not None:
+                    buf[3*(base+dst):3*(base+dst+n)] = buf[3*start:3*(start+n)]
+                else:
+                    matrix[base+dst:base+dst+n] = list(matrix[start:start+n])
+                if fill is not None and exposed[0] < exposed[1]:
+                    matrix[base+exposed[0]:base+exposed[1]] = [fill]*(exposed[1]-exposed[0])
+            elif fill is not None:
+                matrix[base:base+columns] = [fill]*columns
+        if buf is not None:
+            matrix.touched(row0*grid_width + column0, (row1-1)*grid_width + column0 + columns - 1)
 
     def setpixel(self,x,y,color):
         """
         Sets a single pixel at x,y to a color. Accounts for rotation mode.
         """
-        index = self.xy_to_array(x,y)
-        if index is not None:
-            self._matrix[index]=color
+        x += self._origin_x
+        y += self._origin_y
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        if clip_x0 <= x < clip_x1 and clip_y0 <= y < clip_y1:
+            self._matrix[self._index_map[x + y*self._view_width]]=color
 
     def text(self, text, font, x, y, color_foreground, color_background=None, show=False):
         """
@@ -127,96 +1265,247 @@ class display(object):
         :param text: text to display
         :param font: font can be a Adafruit_Bitmap_font (PCF or BDF)
                     object.  Or a string which indicates a ".bin" circuitpython/micropython format
-                    (i.e. - "font5x8.bin")
+                    (i.e. - "font5x8.bin"), which is loaded once and kept by filename.  Or a BinFont
+                    object.
         :param x,y: x,y coordinates to place top left of text box
         :param color_foreground: color of the text
         :param color_background: if a color, the background color behind the text.  If None, then no background is drawn,
                                 good for compositing over other BLING pixels.
         :param show: if true, text is shown immediately on BLING display
         """
-        view_width = self.width
-        view_height = self.height
+        self._text(text, font, x, y, color_foreground, color_background)
+        if show:
+            self.present()
+
+    async def text_async(self, text, font, x, y, color_foreground, color_background=None, show=False):
+        """
+        Same as text(), but draws one font row at a time and lets other asyncio tasks run in
+        between, for large text that would otherwise hold things up.
+        """
+        import asyncio
+        if isinstance(font, (PCF,BDF)):
+            height = self._glyph_cache(font).height
+        else:
+            height = (self._bin_font(font) if isinstance(font,str) else font).font_height
+        for row in range(height):
+            self._text(text, font, x, y, color_foreground, color_background, row, row+1)
+            await asyncio.sleep(0)
+        if show:
+            await self.present_async()
+
+    def _text(self, text, font, x, y, color_foreground, color_background, first_row=0, last_row=None):
+        """
+        Draws text for text(), limited to font rows first_row up to (not including) last_row
+        """
+        view_width = self._view_width
+        index_map = self._index_map
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
         if isinstance(font, (PCF,BDF)):
-            # This is a font object from Adafruit_Bitmap_Font, probably
-            _, height, _, dy = font.get_bounding_box()
-            font.load_glyphs(text)
-            for yg in range(height):
-                y_matrix = yg+y
+            # This is a font object from Adafruit_Bitmap_Font, probably.  Glyphs come from the
+            # per-font cache as one row bitmask per column, so each pixel is just a bit test.
+            cache = self._glyph_cache(font)
+            rows = []
+            for yg in range(max(first_row,clip_y0-y), min(cache.height if last_row is None else last_row, clip_y1-y)):
+                rows.append((1 << yg, (y+yg)*view_width))
+            if rows:
+                matrix = self._matrix
                 x_matrix = x
-                if ( 0 <= y_matrix < view_height):
-                    for c in text:
-                        glyph = font.get_glyph(ord(c))
-                        if not glyph:
+                for columns in cache.glyphs(text):
+                    if columns is None:
+                        continue
+                    if x_matrix >= clip_x1:
+                        break
+                    for i in range(max(0,clip_x0-x_matrix), min(len(columns), clip_x1-x_matrix)):
+                        bits = columns[i]
+                        if bits == 0 and color_background is None:
                             continue
-                        p=0
-                        glyph_y = yg + (glyph.height - (height + dy)) + glyph.dy
-                        if 0 <= glyph_y < glyph.height:
-                            for i in range(glyph.width):
-                                value = glyph.bitmap[i, glyph_y]
-                                pixel = color_background
-                                if value > 0:
-                                    pixel = color_foreground
-                                if (0 <= x_matrix < view_width):
-                                    index = self.xy_to_array(x_matrix,y_matrix)
-                                    if index is not None and pixel is not None:
-                                        self._matrix[index]=pixel
-                                x_matrix += 1
-                                p+=1
-                        else:
-                            # empty section for this glyph
-                                pass
-                        for i in range(glyph.shift_x-p):
-                            if (0 <= x_matrix < view_width):
-                                index = self.xy_to_array(x_matrix,y_matrix)
-                                if index is not None and color_background is not None:
-                                    self._matrix[index]=color_background
-                            x_matrix += 1
-
-        elif isinstance(font,str):
+                        x_index = x_matrix+i
+                        for bit, row in rows:
+                            if bits & bit:
+                                matrix[index_map[row+x_index]]=color_foreground
+                            elif color_background is not None:
+                                matrix[index_map[row+x_index]]=color_background
+                    x_matrix += len(columns)
+
+        elif isinstance(font,(str,BinFont)):
             # https://github.com/adafruit/Adafruit_CircuitPython_framebuf/blob/main/adafruit_framebuf.py#L608
             # This is likely a circuitpython/micropython binary fixed size ".bin" font like font5x8.bin
-            font_bin = adafruit_framebuf.BitmapFont(font)
-            size=1
+            # The font file is read into memory once, and each byte of it is already a column bitmask.
+            if isinstance(font,str):
+                font = self._bin_font(font)
             font_gap = 1
-            font_width = font_bin.font_width
-            font_height = font_bin.font_height
+            font_width = font.font_width
+            advance = font_width + font_gap
+            matrix = self._matrix
             for chunk in text.split("\n"):
-                for i, char in enumerate(chunk):
-                    text_x = x + (i * (font_width + font_gap)) * size
-                    if (
-                        text_x + (font_width * size) > 0
-                        and text_x < view_width
-                        and y + (font_height * size) > 0
-                        and y < view_height
-                    ):
+                rows = []
+                for char_y in range(max(first_row,clip_y0-y), min(font.font_height if last_row is None else last_row, clip_y1-y)):
+                    rows.append((1 << char_y, (y+char_y)*view_width))
+                if rows:
+                    for i, char in enumerate(chunk):
+                        text_x = x + i * advance
+                        if text_x >= clip_x1:
+                            break
+                        if text_x + advance <= clip_x0:
+                            continue
+                        columns = font.glyph(char)
+                        # If the character isn't in the font only the gap between characters is drawn
+                        first = max(0 if columns is not None else font_width, clip_x0-text_x)
                         # Go through each column of the character + the gap between characters.
-                        for char_x in range(font_width+font_gap):
-                            if char_x < font_width:
-                                # Grab the byte for the current column of font data.
-                                font_bin._font.seek(2 + (ord(char) * font_width) + char_x)
-                                try:
-                                    line = struct.unpack("B", font_bin._font.read(1))[0]
-                                except RuntimeError:
-                                    continue  # maybe character isnt there? go to next
-                            else:
-                                line = 0  # the gap between characters
-                            # Go through each row in the column byte.
-                            for char_y in range(font_bin.font_height):
-                                # Draw a pixel for each bit that's flipped on.
-                                x_matrix = text_x + char_x * size
-                                y_matrix = y + char_y * size
-                                if (0 <= x_matrix < view_width and 0 <= y_matrix < view_height):
-                                    index = self.xy_to_array(x_matrix, y_matrix)
-                                    if (line >> char_y) & 0x1:
-                                        if index is not None:
-                                            self._matrix[index]=color_foreground
-                                    else:
-                                        if index is not None and color_background is not None:
-                                            self._matrix[index]=color_background
-                y += font_height * size
+                        for char_x in range(first, min(advance, clip_x1-text_x)):
+                            line = columns[char_x] if char_x < font_width else 0
+                            if line == 0 and color_background is None:
+                                continue
+                            x_index = text_x + char_x
+                            for bit, row in rows:
+                                if line & bit:
+                                    matrix[index_map[row+x_index]]=color_foreground
+                                elif color_background is not None:
+                                    matrix[index_map[row+x_index]]=color_background
+                y += font.font_height
 
+    def _text_columns(self, text, font):
+        """
+        Returns (columns, height) for a line of text, columns being one row bitmask per pixel
+        of advance width.  font is the same as for text()
+        """
+        columns = []
+        if isinstance(font, (PCF,BDF)):
+            cache = self._glyph_cache(font)
+            for glyph in cache.glyphs(text):
+                if glyph is not None:
+                    columns.extend(glyph)
+            return columns, cache.height
+        if isinstance(font,str):
+            font = self._bin_font(font)
+        for char in text:
+            glyph = font.glyph(char)
+            if glyph is None:
+                columns.extend([0] * font.font_width)
+            else:
+                columns.extend(glyph)
+            columns.append(0)  # the gap between characters
+        return columns, font.font_height
+
+    def measure_text(self, text, font):
+        """
+        Measures text without drawing it, for centering, right aligning or working out how
+        far to scroll.  Returns a TextMetrics with the width, height and the x offset of each
+        character, exactly as text() would place them, including proportional PCF/BDF fonts.
+        Results are kept per font and text, so measuring the same message every frame is free.
+
+        :param text: text to measure
+        :param font: font, the same as for text()
+        """
+        key = (font, text)
+        metrics = self._text_metrics.get(key)
+        if metrics is not None:
+            return metrics
+        offsets = []
+        if isinstance(font, (PCF,BDF)):
+            cache = self._glyph_cache(font)
+            x = 0
+            for advance in cache.advances(text):
+                offsets.append(x)
+                x += advance
+            width, height = x, cache.height
+        else:
+            if isinstance(font,str):
+                font = self._bin_font(font)
+            advance = font.font_width + 1  # the gap between characters
+            width = x = 0
+            lines = 1
+            for char in text:
+                offsets.append(x)
+                if char == "\n":
+                    x = 0
+                    lines += 1
+                else:
+                    x += advance
+                    width = max(width, x)
+            height = font.font_height * lines
+        if len(self._text_metrics) >= 32:
+            self._text_metrics = {}
+        metrics = self._text_metrics[key] = TextMetrics(width, height, offsets)
+        return metrics
+
+    def text_strip(self, text, font, color_foreground, color_background=None):
+        """
+        Renders a single line of text once into an offscreen TextStrip, for drawing a window
+        of it at a time with strip() or a Scroller.  Use this for scrolling messages instead
+        of calling text() with a new x every frame.
+
+        :param text: text to render, one line
+        :param font: font, the same as for text()
+        :param color_foreground: color of the text
+        :param color_background: if a color, the background color behind the text.  If None, the
+                                background is transparent when the strip is drawn
+        """
+        columns, height = self._text_columns(text, font)
+        return TextStrip(columns, height, color_foreground, color_background, reverse=self._rotation == 2)
+
+    def strip(self, strip, x, y, show=False):
+        """
+        Draws a TextStrip with its top left at x,y.  Only the part of the strip inside the
+        clip rectangle is touched, so the cost depends on the visible pixels and not the length of
+        the text.  For rotation (0,2) each row is one slice copy, or one per run of text pixels
+        when the background is transparent.
+
+        :param strip: TextStrip from text_strip()
+        :param x,y: coordinates of the top left of the strip, x is usually negative when scrolling
+        :param show: if true, the strip is shown immediately on BLING display
+        """
+        view_width = self._view_width
+        index_map = self._index_map
+        matrix = self._matrix
+        if strip.reversed != (self._rotation == 2):
+            strip.reverse()
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        x0 = max(clip_x0, x)
+        x1 = min(clip_x1, x + strip.width)
+        if x0 < x1:
+            last = strip.width - 1
+            n = x1 - x0
+            columns = strip.columns
+            background = strip.color_background
+            for char_y in range(max(0,clip_y0-y), min(strip.height, clip_y1-y)):
+                row = strip.rows[char_y]
+                bit = 1 << char_y
+                base = (y+char_y)*view_width
+                if self._rotation in [0,2]:
+                    # The window is one run of the stored row, in Neopixel index order
+                    if strip.reversed:
+                        start = strip.width-(x1-x)
+                        index = index_map[base+x1-1]
+                    else:
+                        start = x0-x
+                        index = index_map[base+x0]
+                    if background is not None:
+                        self._write_rgb(index, row, 3*start, n)
+                        continue
+                    # Transparent background, one slice per run of text pixels
+                    i = start
+                    end = start + n
+                    while i < end:
+                        if columns[i] & bit:
+                            run = i
+                            while i < end and columns[i] & bit:
+                                i += 1
+                            self._write_rgb(index+run-start, row, 3*run, i-run)
+                        else:
+                            i += 1
+                else:
+                    for xn in range(x0, x1):
+                        if columns[last-(xn-x) if strip.reversed else xn-x] & bit:
+                            matrix[index_map[base+xn]] = strip.color_foreground
+                        elif background is not None:
+                            matrix[index_map[base+xn]] = background
         if show:
-            self._matrix.show()
+            self.present()
 
     def bitmap(self,image, palette, x,y):
         """
@@ -241,72 +1530,405 @@ class display(object):
         :param xb,yb: the top left coordinates of the portion of the bitmap to be displayed
         :param w,h: width and height of the portion of the bitmap to be displayed
         """
-        width = self.width
-        height = self.height
-        for y1 in range(h):
-            yn = y1+y
-            if (0 <= yn < height):
-                for x1 in range(w):
-                    xn = x1+x
-                    if (0 <= xn < width):
-                        if palette is not None:
-                            self._matrix[self.xy_to_array(xn,yn)]=palette[image[xb+x1,yb+y1]]
-                        else:
-                            # gifio uses RGB565_Swapped, convert to RGB888 more or less
-                            swap = ((image[xb+x1,yb+y1] & 0x00FF) << 8) | ((image[xb+x1,yb+y1] & 0xFF00) >> 8)
-                            r = (swap & 0xF800) >> 8
-                            g = (swap & 0x07E0) >> 3
-                            b = (swap & 0x001F) << 3
-                            self._matrix[self.xy_to_array(xn,yn)]=(r,g,b)
+        width = self._view_width
+        index_map = self._index_map
+        # Clip once.  Every visible bitmap row (rotation 0,2) or column (rotation 1,3) then
+        # lands on a contiguous run of Neopixel indexes and is written with one slice.
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        x0 = max(clip_x0, x)
+        x1 = min(clip_x1, x+w)
+        y0 = max(clip_y0, y)
+        y1 = min(clip_y1, y+h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        # gifio uses RGB565_Swapped, convert to RGB888 more or less with table lookups
+        converter = _rgb565_swapped_converter() if palette is None else None
+        if self._rotation in [0,2]:
+            if self._rotation == 0:
+                xs = range(x0, x1)
+            else:
+                xs = range(x1-1, x0-1, -1)
+            bxs = [xb-x+xn for xn in xs]
+            for yn in range(y0, y1):
+                by = yb-y+yn
+                index = index_map[yn*width + xs[0]]
+                if converter is None:
+                    self._matrix[index:index+len(bxs)] = [palette[image[bx,by]] for bx in bxs]
+                else:
+                    self._matrix[index:index+len(bxs)] = converter.convert([image[bx,by] for bx in bxs])
+        else:
+            if self._rotation == 3:
+                ys = range(y0, y1)
+            else:
+                ys = range(y1-1, y0-1, -1)
+            bys = [yb-y+yn for yn in ys]
+            for xn in range(x0, x1):
+                bx = xb-x+xn
+                index = index_map[ys[0]*width + xn]
+                if converter is None:
+                    self._matrix[index:index+len(bys)] = [palette[image[bx,by]] for by in bys]
+                else:
+                    self._matrix[index:index+len(bys)] = converter.convert([image[bx,by] for by in bys])
+
+    async def bitmap_tile_async(self,image,palette,x,y,xb,yb,w,h):
+        """
+        Same as bitmap_tile(), but draws one row (rotation 0,2) or column (rotation 1,3) at a
+        time and lets other asyncio tasks run in between.
+        """
+        import asyncio
+        if self._rotation in [0,2]:
+            for row in range(h):
+                self.bitmap_tile(image,palette,x,y+row,xb,yb+row,w,1)
+                await asyncio.sleep(0)
+        else:
+            for column in range(w):
+                self.bitmap_tile(image,palette,x+column,y,xb+column,yb,1,h)
+                await asyncio.sleep(0)
+
+    def record(self, x=0, y=0):
+        """
+        Starts recording drawing into a DisplayList instead of drawing on BLING.  Everything
+        drawn until end_record() is kept relative to x,y, so the recording can later be replayed
+        anywhere with replay().  Only pixels that land inside the viewport while recording are
+        kept, so record with everything on screen.  scroll() can't be recorded.
+
+        :param x,y: the origin of the recording
+        """
+        if self._recording is not None:
+            raise RuntimeError("Already recording")
+        self._recording = (self._matrix, x+self._origin_x, y+self._origin_y)
+        self._matrix = _Recorder(self._num_pixels)
+
+    def end_record(self):
+        """Stops recording and returns the DisplayList of everything drawn since record()"""
+        if self._recording is None:
+            raise RuntimeError("Not recording")
+        pixels = self._matrix.pixels
+        self._matrix, origin_x, origin_y = self._recording
+        self._recording = None
+        width = self._view_width
+        # index to viewport position, the reverse of the index map
+        position = {}
+        for i in range(len(self._index_map)):
+            position[self._index_map[i]] = i
+        # Group pixels into lines along the Neopixel index order, then runs along each line
+        aligned = self._rotation in [0,2]
+        lines = {}
+        for index, color in pixels.items():
+            x, y = position[index] % width, position[index] // width
+            if aligned:
+                line, along = y - origin_y, x - origin_x
+            else:
+                line, along = x - origin_x, y - origin_y
+            lines.setdefault(line, {})[along] = color
+        descending = self._rotation in [1,2]
+        spans = []
+        data = bytearray()
+        for line in sorted(lines):
+            points = lines[line]
+            run = []
+            for along in sorted(points):
+                if run and along != run[-1] + 1:
+                    spans.append(self._compile_span(line, run, points, descending, data))
+                    run = []
+                run.append(along)
+            spans.append(self._compile_span(line, run, points, descending, data))
+        return DisplayList(self._rotation, spans, data)
+
+    @staticmethod
+    def _compile_span(line, run, points, descending, data):
+        """Appends a run of pixels to data in index order, and returns its span tuple"""
+        offset = len(data)
+        data.extend(bytes(3*len(run)))
+        if descending:
+            run = run[::-1]
+        _pack_rgb([points[along] for along in run], data, offset)
+        return (line, min(run), len(run), offset)
+
+    def replay(self, display_list, x=0, y=0):
+        """
+        Draws a DisplayList from end_record() with its origin at x,y, clipping each span.
+
+        :param display_list: DisplayList to draw, it must have been recorded in the current rotation
+        :param x,y: where to put the origin of the recording
+        """
+        if display_list.rotation != self._rotation:
+            raise ValueError("DisplayList was recorded for rotation {}".format(display_list.rotation))
+        width = self._view_width
+        index_map = self._index_map
+        data = memoryview(display_list.data)
+        aligned = self._rotation in [0,2]
+        descending = self._rotation in [1,2]
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        if aligned:
+            line_dx, along_dx, line0, line1, along0, along1 = y, x, clip_y0, clip_y1, clip_x0, clip_x1
+        else:
+            line_dx, along_dx, line0, line1, along0, along1 = x, y, clip_x0, clip_x1, clip_y0, clip_y1
+        for line, start, n, offset in display_list.spans:
+            line += line_dx
+            if not line0 <= line < line1:
+                continue
+            start += along_dx
+            first = max(along0, start)
+            end = min(along1, start+n)
+            if first >= end:
+                continue
+            if descending:
+                offset += 3*(start+n-end)
+                along = end-1
+            else:
+                offset += 3*(first-start)
+                along = first
+            if aligned:
+                index = index_map[line*width+along]
+            else:
+                index = index_map[along*width+line]
+            self._write_rgb(index, data, offset, end-first)
+
+    def _write_rgb(self, index, data, offset, n):
+        """
+        Copies n pixels of r,g,b bytes from data (starting at byte offset) to consecutive
+        Neopixel indexes starting at index, in as few operations as the target allows.
+        """
+        matrix = self._matrix
+        if isinstance(matrix, FrameBuffer):
+            matrix.buf[3*index:3*(index+n)] = data[offset:offset+3*n]
+            matrix.touched(index, index+n-1)
+        elif _FLAT_SLICES:
+            matrix[index:index+n] = data[offset:offset+3*n]
+        else:
+            matrix[index:index+n] = [(data[i], data[i+1], data[i+2]) for i in range(offset, offset+3*n, 3)]
+
+    def prerender(self, image, palette, xb=0, yb=0, w=None, h=None):
+        """
+        Converts a portion of a displayio-compatible bitmap once into a Frame laid out for the
+        current rotation.  Drawing the Frame with draw_frame() skips the palette lookups and
+        index mapping that bitmap_tile() does every time.
+
+        :param image: displayio-compatible bitmap object
+        :param palette: palette associated with image, if None, will convert from RGB565_Swapped colorspace
+                        to RGB888 on BLING display (used by gifio)
+        :param xb,yb: the top left coordinates of the portion of the bitmap to use
+        :param w,h: width and height of the portion of the bitmap to use, default is the rest of the bitmap
+        """
+        if w is None:
+            w = image.width - xb
+        if h is None:
+            h = image.height - yb
+        if palette is None:
+            palette = _rgb565_swapped_converter()
+        data = bytearray(3*w*h)
+        offset = 0
+        if self._rotation in [0,2]:
+            if self._rotation == 0:
+                bxs = range(xb, xb+w)
+            else:
+                bxs = range(xb+w-1, xb-1, -1)
+            for by in range(yb, yb+h):
+                _pack_rgb([palette[image[bx,by]] for bx in bxs], data, offset)
+                offset += 3*w
+        else:
+            if self._rotation == 3:
+                bys = range(yb, yb+h)
+            else:
+                bys = range(yb+h-1, yb-1, -1)
+            for bx in range(xb, xb+w):
+                _pack_rgb([palette[image[bx,by]] for by in bys], data, offset)
+                offset += 3*h
+        return Frame(w, h, self._rotation, data)
+
+    def draw_frame(self, frame, x, y):
+        """
+        Draws a Frame from prerender() with its top left at x,y, clipped to the clip rectangle.
+
+        :param frame: Frame to draw, it must have been made for the current rotation
+        :param x,y: coordinates on BLING display for the frame's top left corner
+        """
+        if frame.rotation != self._rotation:
+            raise ValueError("Frame was rendered for rotation {}".format(frame.rotation))
+        width = self._view_width
+        index_map = self._index_map
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        x0 = max(clip_x0, x)
+        x1 = min(clip_x1, x+frame.width)
+        y0 = max(clip_y0, y)
+        y1 = min(clip_y1, y+frame.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        data = memoryview(frame.data)
+        if self._rotation in [0,2]:
+            n = x1-x0
+            for yn in range(y0, y1):
+                line = (yn-y)*frame.width
+                if self._rotation == 0:
+                    self._write_rgb(index_map[yn*width+x0], data, 3*(line+x0-x), n)
+                else:
+                    self._write_rgb(index_map[yn*width+x1-1], data, 3*(line+frame.width-(x1-x)), n)
+        else:
+            n = y1-y0
+            for xn in range(x0, x1):
+                line = (xn-x)*frame.height
+                if self._rotation == 3:
+                    self._write_rgb(index_map[y0*width+xn], data, 3*(line+y0-y), n)
+                else:
+                    self._write_rgb(index_map[(y1-1)*width+xn], data, 3*(line+frame.height-(y1-y)), n)
 
     def line(self, x_0, y_0, x_1, y_1, color):
         # Cribbed mercilessly from https://github.com/adafruit/Adafruit_CircuitPython_framebuf/blob/main/adafruit_framebuf.py#L433
         # pylint: disable=too-many-arguments
         """
         Draw a line from x_0,y_0 to x_1,y_1 in color.  Uses Bresenham's line algorithm
-        Based on Adafruit_CircuitPython_framebuf
-        """
-        d_x = abs(x_1 - x_0)
-        d_y = abs(y_1 - y_0)
-        x, y = x_0, y_0
-        s_x = -1 if x_0 > x_1 else 1
-        s_y = -1 if y_0 > y_1 else 1
-        if d_x > d_y:
-            err = d_x / 2.0
-            while x != x_1:
-                self.setpixel(x, y, color)
-                err -= d_y
-                if err < 0:
-                    y += s_y
-                    err += d_x
-                x += s_x
-        else:
-            err = d_y / 2.0
-            while y != y_1:
-                self.setpixel(x, y, color)
-                err -= d_x
+        Based on Adafruit_CircuitPython_framebuf.  See lines() for how it's drawn.
+        """
+        self.lines(((x_0, y_0, x_1, y_1),), color)
+
+    def polyline(self, points, color, closed=False):
+        """
+        Draws lines joining a sequence of points, like a chart or waveform, in color.
+
+        :param points: sequence of x,y pairs
+        :param closed: if True, the last point is joined back to the first, making a polygon
+        """
+        segments = []
+        for i in range(1, len(points)):
+            segments.append((points[i-1][0], points[i-1][1], points[i][0], points[i][1]))
+        if closed and len(points) > 2:
+            segments.append((points[-1][0], points[-1][1], points[0][0], points[0][1]))
+        elif len(points) == 1:
+            segments.append((points[0][0], points[0][1], points[0][0], points[0][1]))
+        self.lines(segments, color)
+
+    def lines(self, segments, color):
+        """
+        Draws many lines in color, sharing the setup between them.  Horizontal and vertical
+        lines go to hline() and vline().  Other lines use Bresenham's line algorithm in whole
+        numbers, starting and stopping at the edges of the clip rectangle so no time is spent
+        on pixels that can't be seen, and pixels in a row along the wide axis of BLING are
+        written as one slice.
+
+        :param segments: sequence of x_0,y_0,x_1,y_1 tuples
+        """
+        origin_x = self._origin_x
+        origin_y = self._origin_y
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        view_width = self._view_width
+        index_map = self._index_map
+        matrix = self._matrix
+        aligned_x = self._rotation in [0,2]
+        for x_0, y_0, x_1, y_1 in segments:
+            if y_0 == y_1:
+                self.hline(min(x_0, x_1), y_0, abs(x_1 - x_0) + 1, color)
+                continue
+            if x_0 == x_1:
+                self.vline(x_0, min(y_0, y_1), abs(y_1 - y_0) + 1, color)
+                continue
+            x_0 += origin_x
+            x_1 += origin_x
+            y_0 += origin_y
+            y_1 += origin_y
+            # Step along the major axis a, the minor axis b moves by one now and then
+            if abs(x_1 - x_0) > abs(y_1 - y_0):
+                a_0, b_0, a_1, b_1 = x_0, y_0, x_1, y_1
+                a_lo, a_hi, b_lo, b_hi = clip_x0, clip_x1, clip_y0, clip_y1
+                a_step, b_step = 1, view_width
+                runs = aligned_x
+            else:
+                a_0, b_0, a_1, b_1 = y_0, x_0, y_1, x_1
+                a_lo, a_hi, b_lo, b_hi = clip_y0, clip_y1, clip_x0, clip_x1
+                a_step, b_step = view_width, 1
+                runs = not aligned_x
+            d_a = abs(a_1 - a_0)
+            d_b = abs(b_1 - b_0)
+            s_a = -1 if a_0 > a_1 else 1
+            s_b = -1 if b_0 > b_1 else 1
+            # Steps i that land inside the clip rectangle along a ...
+            if s_a > 0:
+                first, last = a_lo - a_0, a_hi - 1 - a_0
+            else:
+                first, last = a_0 - (a_hi - 1), a_0 - a_lo
+            # ... and along b, where after i steps b has moved k = ceil((2*d_b*i - d_a) / (2*d_a))
+            if s_b > 0:
+                k_lo, k_hi = b_lo - b_0, b_hi - 1 - b_0
+            else:
+                k_lo, k_hi = b_0 - (b_hi - 1), b_0 - b_lo
+            if k_lo > 0:
+                first = max(first, (d_a*(2*k_lo - 1)) // (2*d_b) + 1)
+            last = min(last, d_a, (d_a*(2*k_hi + 1)) // (2*d_b))
+            first = max(first, 0)
+            if first > last:
+                continue
+            k = -((d_a - 2*d_b*first) // (2*d_a))
+            err = d_a - 2*d_b*first + 2*d_a*k
+            position = (a_0 + s_a*first)*a_step + (b_0 + s_b*k)*b_step
+            a_move = s_a*a_step
+            b_move = s_b*b_step
+            run_start = None
+            for _ in range(last - first + 1):
+                index = index_map[position]
+                if runs:
+                    # Neighbours along a are next to each other in the Neopixel order
+                    if run_start is None:
+                        run_start = run_end = index
+                    elif index < run_start:
+                        run_start = index
+                    else:
+                        run_end = index
+                else:
+                    matrix[index] = color
+                err -= 2*d_b
+                position += a_move
                 if err < 0:
-                    x += s_x
-                    err += d_y
-                y += s_y
-        self.setpixel(x, y, color)
+                    err += 2*d_a
+                    position += b_move
+                    if run_start is not None:
+                        matrix[run_start:run_end+1] = [color]*(run_end-run_start+1)
+                        run_start = None
+            if run_start is not None:
+                matrix[run_start:run_end+1] = [color]*(run_end-run_start+1)
+
+    def _span(self, color, n):
+        """
+        Returns a list of n copies of color for writing to a slice of the Neopixels.  The lists
+        are kept and handed out again while the color stays the same, so repeated fills don't
+        build a new list every time.  Don't change the list that comes back.
+        """
+        if color != self._span_color:
+            self._span_color = color
+            self._spans = {}
+        span = self._spans.get(n)
+        if span is None:
+            if len(self._spans) >= 8:
+                self._spans = {}
+            span = self._spans[n] = [color]*n
+        return span
 
     def hline_aligned(self,x,y,w,color):
         """
         Draws a horizontal line that's aliged with the wide-axis of the BLING display.  Used by hline()
         in cases of rotation (0,2)
         """
-        x0 = max(0, min(self.width-1,x))
-        x1 = max(0, min(self.width-1,x+w-1))
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        x0 = max(clip_x0, x)
+        x1 = min(clip_x1, x+w) - 1
+        if x0 > x1 or not clip_y0 <= y < clip_y1:
+            return
 
-        x0_index = self.xy_to_array(x0,y)
-        x1_index = self.xy_to_array(x1,y)
+        row = y*self._view_width
+        x0_index = self._index_map[row+x0]
+        x1_index = self._index_map[row+x1]
 
-        if (x0_index is not None and x1_index is not None):
-            if (x1_index > x0_index):
-                self._matrix[x0_index:x1_index+1] =  [color]*(x1_index-x0_index+1)
-            else:
-                self._matrix[x1_index:x0_index+1] =  [color]*(x0_index-x1_index+1)
+        if (x1_index > x0_index):
+            self._matrix[x0_index:x1_index+1] = self._span(color, x1_index-x0_index+1)
+        else:
+            self._matrix[x1_index:x0_index+1] = self._span(color, x0_index-x1_index+1)
 
     def vline_aligned(self,x,y,h,color):
         """
@@ -314,17 +1936,21 @@ class display(object):
         in cases of rotation (1,3)
 
         """
-        y0 = max(0, min(self.height-1,y))
-        y1 = max(0, min(self.height-1,y+h-1))
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        y0 = max(clip_y0, y)
+        y1 = min(clip_y1, y+h) - 1
+        if y0 > y1 or not clip_x0 <= x < clip_x1:
+            return
 
-        y0_index = self.xy_to_array(x,y0)
-        y1_index = self.xy_to_array(x,y1)
+        y0_index = self._index_map[x+y0*self._view_width]
+        y1_index = self._index_map[x+y1*self._view_width]
 
-        if (y0_index is not None and y1_index is not None):
-            if (y1_index > y0_index):
-                self._matrix[y0_index:y1_index+1] =  [color]*(y1_index-y0_index+1)
-            else:
-                self._matrix[y1_index:y0_index+1] =  [color]*(y0_index-y1_index+1)
+        if (y1_index > y0_index):
+            self._matrix[y0_index:y1_index+1] = self._span(color, y1_index-y0_index+1)
+        else:
+            self._matrix[y1_index:y0_index+1] = self._span(color, y0_index-y1_index+1)
 
     def hline(self,x,y,w,color):
         """
@@ -354,41 +1980,50 @@ class display(object):
         """
         Draws a horiztonal line, no optimization case.  Use hline() instead if possible.
         """
-        if 0<= y < self.height:
-            for i in range(w):
-                if (0 <= x+i < self.width):
-                    self.setpixel(x+i,y,color)
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        if clip_y0 <= y < clip_y1:
+            index_map = self._index_map
+            row = y*self._view_width
+            for xn in range(max(clip_x0,x), min(clip_x1,x+w)):
+                self._matrix[index_map[row+xn]]=color
 
     def vline_direct(self,x,y,h,color):
         """
         Draws a vertical line, no optimization case.  Use hline() instead if possible.
         """
-        if 0 <= x < self.width:
-            for i in range(h):
-                if (0 <= y+i < self.height):
-                    self.setpixel(x,y+i,color)
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        if clip_x0 <= x < clip_x1:
+            index_map = self._index_map
+            view_width = self._view_width
+            for yn in range(max(clip_y0,y), min(clip_y1,y+h)):
+                self._matrix[index_map[x+yn*view_width]]=color
 
 
-    def circle(self, center_x, center_y, radius, color):
+    @staticmethod
+    def _circle_rows(radius):
         # mercilessly cribbed from https://github.com/adafruit/Adafruit_CircuitPython_framebuf/blob/dd4c4e927819f51ff1b1aa45ff11750581628d79/adafruit_framebuf.py#L369
-        """Draw a circle at the given midpoint location, radius and color.
-        The ```circle``` method draws only a 1 pixel outline.
-        Based on Adafruit_CircuitPython_framebuf
         """
+        Returns the outline of one quadrant of a circle as {dy: (first dx, last dx)}, one run
+        of pixels per row out from the center.  The other quadrants are mirror images.
+        """
+        rows = {}
         x = radius - 1
         y = 0
         d_x = 1
         d_y = 1
         err = d_x - (radius << 1)
         while x >= y:
-            self.setpixel(center_x + x, center_y + y, color)
-            self.setpixel(center_x + y, center_y + x, color)
-            self.setpixel(center_x - y, center_y + x, color)
-            self.setpixel(center_x - x, center_y + y, color)
-            self.setpixel(center_x - x, center_y - y, color)
-            self.setpixel(center_x - y, center_y - x, color)
-            self.setpixel(center_x + y, center_y - x, color)
-            self.setpixel(center_x + x, center_y - y, color)
+            # Each step gives a point in both octants of the quadrant
+            for dx, dy in ((x, y), (y, x)):
+                run = rows.get(dy)
+                if run is None:
+                    rows[dy] = (dx, dx)
+                else:
+                    rows[dy] = (min(run[0], dx), max(run[1], dx))
             if err <= 0:
                 y += 1
                 err += d_y
@@ -397,6 +2032,187 @@ class display(object):
                 x -= 1
                 d_x += 2
                 err += d_x - (radius << 1)
+        return rows
+
+    @staticmethod
+    def _ellipse_rows(rx, ry):
+        """
+        Returns the outline of one quadrant of an ellipse with radii rx,ry as
+        {dy: (first dx, last dx)}, using the midpoint ellipse algorithm in integers.
+        """
+        if ry == 0:
+            return {0: (0, rx)}
+        rows = {}
+        rx2 = rx*rx
+        ry2 = ry*ry
+        x = 0
+        y = ry
+        px = 0
+        py = 2*rx2*y
+        # The decision variables are kept times 4 so they stay whole numbers
+        p = 4*ry2 - 4*rx2*ry + rx2
+        while px < py:
+            run = rows.get(y)
+            rows[y] = (x, x) if run is None else (run[0], x)
+            x += 1
+            px += 2*ry2
+            if p < 0:
+                p += 4*(ry2 + px)
+            else:
+                y -= 1
+                py -= 2*rx2
+                p += 4*(ry2 + px - py)
+        p = ry2*(2*x + 1)*(2*x + 1) + 4*rx2*(y - 1)*(y - 1) - 4*rx2*ry2
+        while y >= 0:
+            run = rows.get(y)
+            rows[y] = (x, x) if run is None else (run[0], x)
+            y -= 1
+            py -= 2*rx2
+            if p > 0:
+                p += 4*(rx2 - py)
+            else:
+                x += 1
+                px += 2*ry2
+                p += 4*(rx2 - py + px)
+        # On flat ellipses the second region can run out of rows before x gets to rx, so
+        # carry the middle row out to the full width
+        first, last = rows.get(0, (x, x))
+        rows[0] = (min(first, rows[1][1] + 1 if 1 in rows else first), rx)
+        return rows
+
+    @staticmethod
+    def _transpose_rows(rows):
+        """Turns quadrant rows {dy: (first dx, last dx)} into the same pixels as columns {dx: (first dy, last dy)}"""
+        columns = {}
+        for dy, (first, last) in rows.items():
+            for dx in range(first, last+1):
+                run = columns.get(dx)
+                columns[dx] = (dy, dy) if run is None else (min(run[0], dy), max(run[1], dy))
+        return columns
+
+    def _shape_rows(self, shape, a, b=None):
+        """
+        Returns the quadrant rows of a circle (shape "c", radius a) or ellipse (shape "e", radii a,b)
+        laid out for the current rotation, working them out only the first time.
+        """
+        key = (shape, a, b, self._rotation in [1,3])
+        rows = self._shapes.get(key)
+        if rows is None:
+            rows = self._circle_rows(a) if shape == "c" else self._ellipse_rows(a, b)
+            if key[3]:
+                # Runs along the wide axis of BLING are columns of the viewport
+                rows = self._transpose_rows(rows)
+            if len(self._shapes) >= 32:
+                self._shapes = {}
+            self._shapes[key] = rows
+        return rows
+
+    def _draw_rows(self, left, top, right, bottom, rows, color, fill):
+        """
+        Draws a shape from its quadrant rows from _shape_rows(), mirrored into all four quadrants
+        around the corners left,top and right,bottom (the same point for a circle or ellipse).
+        Each run is clipped and written with one slice along the wide axis of BLING, like
+        hline_aligned() and vline_aligned() do.
+        """
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        left += self._origin_x
+        right += self._origin_x
+        top += self._origin_y
+        bottom += self._origin_y
+        view_width = self._view_width
+        index_map = self._index_map
+        matrix = self._matrix
+        transposed = self._rotation in [1,3]
+        if transposed:
+            # Runs go down columns of the viewport, so work with x and y swapped
+            left, top, right, bottom = top, left, bottom, right
+            clip_x0, clip_y0, clip_x1, clip_y1 = clip_y0, clip_x0, clip_y1, clip_x1
+        for dv, (first, last) in rows.items():
+            for v in ((top - dv, bottom + dv) if dv or top != bottom else (top,)):
+                if not clip_y0 <= v < clip_y1:
+                    continue
+                if fill or first == 0:
+                    runs = ((left - last, right + last),)
+                else:
+                    runs = ((left - last, left - first), (right + first, right + last))
+                for u0, u1 in runs:
+                    u0 = max(clip_x0, u0)
+                    u1 = min(clip_x1 - 1, u1)
+                    if u0 > u1:
+                        continue
+                    if transposed:
+                        i0 = index_map[v + u0*view_width]
+                        i1 = index_map[v + u1*view_width]
+                    else:
+                        i0 = index_map[u0 + v*view_width]
+                        i1 = index_map[u1 + v*view_width]
+                    if i0 == i1:
+                        matrix[i0] = color
+                    elif i0 < i1:
+                        matrix[i0:i1+1] = self._span(color, i1-i0+1)
+                    else:
+                        matrix[i1:i0+1] = self._span(color, i0-i1+1)
+
+    def circle(self, center_x, center_y, radius, color):
+        """Draw a circle at the given midpoint location, radius and color.
+        The ```circle``` method draws only a 1 pixel outline.
+        Based on Adafruit_CircuitPython_framebuf.  Each row of the outline is drawn as a run of
+        pixels along the wide axis of BLING rather than a pixel at a time.
+        """
+        self._draw_rows(center_x, center_y, center_x, center_y, self._shape_rows("c", radius), color, False)
+
+    def fill_circle(self, center_x, center_y, radius, color):
+        """
+        Draw a filled circle, the same size as circle() draws.  Drawn as one run of pixels per
+        row along the wide axis of BLING, so it costs per row rather than per pixel.
+        """
+        self._draw_rows(center_x, center_y, center_x, center_y, self._shape_rows("c", radius), color, True)
+
+    def ellipse(self, center_x, center_y, radius_x, radius_y, color, fill=False):
+        """
+        Draw an ellipse outline, or filled ellipse, accounting for rotation.  Drawn as runs of
+        pixels along the wide axis of BLING.
+
+        :param center_x,center_y: center of the ellipse
+        :param radius_x,radius_y: the ellipse reaches from center_x-radius_x to center_x+radius_x, the same for y
+        :param fill: if True, the ellipse will be filled, otherwise just the outline is drawn
+        """
+        if radius_x < 0 or radius_y < 0:
+            return
+        self._draw_rows(center_x, center_y, center_x, center_y, self._shape_rows("e", radius_x, radius_y), color, fill)
+
+    def fill_ellipse(self, center_x, center_y, radius_x, radius_y, color):
+        """Draw a filled ellipse, see ellipse()"""
+        self.ellipse(center_x, center_y, radius_x, radius_y, color, True)
+
+    def round_rect(self, x, y, w, h, radius, color, fill=False):
+        """
+        Draws a rectangle with rounded corners, accounting for rotation, with optional fill.
+
+        :param x,y: corner of rectangle
+        :param w,h: width and height of rectangle
+        :param radius: radius of the corners, limited to what fits in the rectangle
+        :param fill: if True, rectangle will be filled, otherwise just the outline is drawn
+        """
+        if w<=0 or h<=0:
+            return
+        radius = max(0, min(radius, (min(w, h) - 1) // 2))
+        left = x + radius
+        right = x + w - 1 - radius
+        top = y + radius
+        bottom = y + h - 1 - radius
+        # The corners.  Runs along the wide axis of BLING join corners on the same side, so
+        # depending on rotation this also draws two of the straight edges
+        self._draw_rows(left, top, right, bottom, self._shape_rows("e", radius, radius), color, fill)
+        # The straight edges, the same in every rotation
+        if fill:
+            self.fill_rect(left, y, right - left + 1, h, color)
+            self.fill_rect(x, top, w, bottom - top + 1, color)
+        else:
+            self.hline(left, y, right - left + 1, color)
+            self.hline(left, y + h - 1, right - left + 1, color)
+            self.vline(x, top, bottom - top + 1, color)
+            self.vline(x + w - 1, top, bottom - top + 1, color)
 
     def fill_rect(self, x,y,w,h,color):
         """
@@ -407,12 +2223,42 @@ class display(object):
         """
         if w<=0 or h<=0:
             return
+        # Clip once, so rows or columns outside the clip rectangle aren't even visited
+        clip_x0, clip_y0, clip_x1, clip_y1 = self._clip
+        x += self._origin_x
+        y += self._origin_y
+        x0 = max(clip_x0, x)
+        x1 = min(clip_x1, x+w)
+        y0 = max(clip_y0, y)
+        y1 = min(clip_y1, y+h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        # Each row (rotation 0,2) or column (rotation 1,3) is one run of Neopixel indexes.  Runs
+        # that touch, like the rows of a rectangle as wide as BLING, are joined and written together
+        view_width = self._view_width
+        corner = x0 + y0*view_width
         if self._rotation in [0,2]:
-            for y in range(y,y+h):
-                self.hline(x,y,w,color)
+            far, step, count = x1-1-x0, view_width, y1-y0
         else:
-            for x in range(x,x+w):
-                self.vline(x,y,h,color)
+            far, step, count = (y1-1-y0)*view_width, 1, x1-x0
+        index_map = self._index_map
+        matrix = self._matrix
+        start = None
+        for position in range(corner, corner+count*step, step):
+            first = index_map[position]
+            last = index_map[position+far]
+            if first > last:
+                first, last = last, first
+            if start is None:
+                start, end = first, last
+            elif first == end+1:
+                end = last
+            elif last == start-1:
+                start = first
+            else:
+                matrix[start:end+1] = self._span(color, end-start+1)
+                start, end = first, last
+        matrix[start:end+1] = self._span(color, end-start+1)
 
     def rect(self,x,y,w,h,color,fill=False):
         """
@@ -431,3 +2277,734 @@ class display(object):
             self.hline(x,y+h-1,w,color)
             self.vline(x,y,h,color)
             self.vline(x+w-1,y,h,color)
+
+
+class Scroller(object):
+    """
+    Scrolls a TextStrip right to left across BLING, like a news ticker.  Each step() draws the
+    visible window of the strip and moves it along.  It scrolls across the display's clip
+    rectangle, so push_clip() first to run a ticker in part of the display.
+
+    :param display: BLING display object
+    :param strip: TextStrip from display.text_strip()
+    :param y: row of the viewport for the top of the strip
+    :param speed: pixels to move per step()
+    :param loop: if True, the strip starts over from the right once it has scrolled off
+    """
+
+    def __init__(self, display, strip, y=0, speed=1, loop=False):
+        self._display = display
+        self.strip = strip
+        self.y = y
+        self.speed = speed
+        self.loop = loop
+        self.reset()
+
+    def reset(self):
+        """Starts the strip over, just off the right side of the clip rectangle"""
+        clip_x, _, clip_w, _ = self._display.clip_rect
+        self.x = clip_x + clip_w
+        self.done = False
+
+    def draw(self):
+        """
+        Draws the strip at the current position.  If the strip has a background color, the
+        uncovered parts of its rows are filled with it, so no fill() is needed between frames.
+        """
+        display = self._display
+        strip = self.strip
+        display.strip(strip, self.x, self.y)
+        if strip.color_background is not None:
+            clip_x, _, clip_w, _ = display.clip_rect
+            if self.x > clip_x:
+                display.fill_rect(clip_x, self.y, self.x-clip_x, strip.height, strip.color_background)
+            end = self.x + strip.width
+            if end < clip_x + clip_w:
+                display.fill_rect(end, self.y, clip_x+clip_w-end, strip.height, strip.color_background)
+
+    def run(self, fps=30):
+        """Scrolls the strip at fps steps per second until it's done (forever, if loop is True)"""
+        Animator(self._display, fps).run(lambda frame: self.step())
+
+    async def run_async(self, fps=30):
+        """Same as run(), but waits with asyncio so other tasks run between steps"""
+        await Animator(self._display, fps).run_async(lambda frame: self.step())
+
+    def step(self):
+        """
+        Draws the current window and moves the strip along by speed pixels.  Returns False
+        once the strip has scrolled completely off the left side (never, if loop is True)
+        """
+        if self.done:
+            return False
+        self.draw()
+        self.x -= self.speed
+        clip_x, _, clip_w, _ = self._display.clip_rect
+        if self.x + self.strip.width <= clip_x:
+            if self.loop:
+                self.x = clip_x + clip_w
+            else:
+                self.done = True
+        return True
+
+
+class SpriteSheet(object):
+    """
+    A displayio-compatible bitmap cut into a grid of equal size tiles, one animation frame
+    each, numbered left to right then top to bottom.  Each frame is converted with
+    display.prerender() the first time it's drawn and kept, so looping an animation doesn't
+    repeat the palette lookups.  Least recently drawn frames are dropped once the cached
+    frames would take more than memory_budget bytes.
+
+    :param display: BLING display object
+    :param image: displayio-compatible bitmap object
+    :param palette: palette associated with image, if None, will convert from RGB565_Swapped colorspace
+    :param tile_width,tile_height: size of one frame
+    :param step_x,step_y: distance between frames in the bitmap, default is the tile size
+    :param memory_budget: most bytes to spend on cached frames (3 bytes per pixel per frame)
+    """
+
+    def __init__(self, display, image, palette, tile_width, tile_height, step_x=None, step_y=None, memory_budget=32768):
+        self._display = display
+        self.image = image
+        self.palette = palette
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self._step_x = tile_width if step_x is None else step_x
+        self._step_y = tile_height if step_y is None else step_y
+        self._columns = (image.width - tile_width) // self._step_x + 1
+        self.frame_count = self._columns * ((image.height - tile_height) // self._step_y + 1)
+        self.max_frames = max(1, memory_budget // (3 * tile_width * tile_height))
+        self._rotation = display.rotation
+        self._frames = {}
+        self._tick = 0
+
+    def frame(self, n):
+        """Returns frame n as a Frame for the current rotation, converting it if it isn't cached"""
+        if self._rotation != self._display.rotation:
+            # Cached frames are laid out for one rotation
+            self._rotation = self._display.rotation
+            self._frames = {}
+        self._tick += 1
+        entry = self._frames.get(n)
+        if entry is None:
+            if not 0 <= n < self.frame_count:
+                raise IndexError("SpriteSheet has {} frames".format(self.frame_count))
+            while len(self._frames) >= self.max_frames:
+                oldest = None
+                for key in self._frames:
+                    if oldest is None or self._frames[key][0] < self._frames[oldest][0]:
+                        oldest = key
+                del self._frames[oldest]
+            xb = (n % self._columns) * self._step_x
+            yb = (n // self._columns) * self._step_y
+            entry = [0, self._display.prerender(self.image, self.palette, xb, yb, self.tile_width, self.tile_height)]
+            self._frames[n] = entry
+        entry[0] = self._tick
+        return entry[1]
+
+    def draw(self, n, x, y):
+        """Draws frame n with its top left at x,y, clipped"""
+        self._display.draw_frame(self.frame(n), x, y)
+
+    def clear(self):
+        """Empties the frame cache"""
+        self._frames = {}
+
+    def __len__(self):
+        return self.frame_count
+
+
+class Sprite(object):
+    """
+    An animation from a SpriteSheet at a position.  advance() moves to the next frame of the
+    animation and draw() draws it.
+
+    :param sheet: SpriteSheet with the frames
+    :param x,y: coordinates on BLING display for the top left of the sprite
+    :param frames: sequence of frame numbers making up the animation, default is every frame in order
+    """
+
+    def __init__(self, sheet, x=0, y=0, frames=None):
+        self.sheet = sheet
+        self.x = x
+        self.y = y
+        self.frames = range(sheet.frame_count) if frames is None else frames
+        self.index = 0
+
+    def advance(self):
+        """Moves on to the next frame of the animation, starting over after the last"""
+        self.index = (self.index + 1) % len(self.frames)
+
+    def draw(self):
+        """Draws the current frame at x,y"""
+        self.sheet.draw(self.frames[self.index], self.x, self.y)
+
+
+class GifPlayer(object):
+    """
+    Plays an animated gif on BLING against each frame's delay, using gifio.
+
+    Frames are decoded once and kept as pre-converted Frames for the current rotation as long
+    as the whole (cropped) animation fits in memory_budget bytes, so looping a short gif
+    doesn't decode or convert colors again.  Longer gifs are decoded as they play.
+
+    :param display: BLING display object
+    :param gif: gif filename, or a gifio.OnDiskGif object
+    :param x,y: coordinates on BLING display for the top left of the gif, can be changed while playing
+    :param xb,yb: the top left coordinates of the portion of the gif to be displayed
+    :param w,h: width and height of the portion of the gif to be displayed, default (and at most) the rest of the gif
+    :param memory_budget: most bytes to spend on cached frames (3 bytes per pixel per frame)
+    """
+
+    def __init__(self, display, gif, x=0, y=0, xb=0, yb=0, w=None, h=None, memory_budget=65536):
+        if isinstance(gif, str):
+            import gifio
+            gif = gifio.OnDiskGif(gif)
+        self._display = display
+        self._gif = gif
+        self.x = x
+        self.y = y
+        self._xb = xb
+        self._yb = yb
+        # Never more than the gif has, since cached frames read every pixel of the region
+        self._w = gif.width - xb if w is None else min(w, gif.width - xb)
+        self._h = gif.height - yb if h is None else min(h, gif.height - yb)
+        self.frame_count = gif.frame_count
+        self.cached = 3 * self._w * self._h * self.frame_count <= memory_budget
+        self._frames = [None] * self.frame_count
+        self._delays = [0] * self.frame_count
+        self._rotation = display.rotation
+        # _index is the frame being shown, _decoded the next frame gifio will decode
+        self._index = -1
+        self._decoded = 0
+        self.stats = FrameStats()
+
+    def _decode(self):
+        index = self._decoded
+        self._delays[index] = self._gif.next_frame()
+        self._decoded = (index + 1) % self.frame_count
+        if self.cached:
+            self._frames[index] = self._display.prerender(
+                self._gif.bitmap, getattr(self._gif, "palette", None), self._xb, self._yb, self._w, self._h)
+
+    def advance(self):
+        """Moves on to the next frame, decoding it if it isn't cached.  Returns its delay in seconds"""
+        if self._rotation != self._display.rotation:
+            # Cached frames are laid out for one rotation
+            self._rotation = self._display.rotation
+            self._frames = [None] * self.frame_count
+        self._index = (self._index + 1) % self.frame_count
+        if self.cached:
+            while self._frames[self._index] is None:
+                self._decode()
+        else:
+            self._decode()
+        return self._delays[self._index]
+
+    def draw(self):
+        """Draws the current frame at x,y"""
+        if self.cached:
+            self._display.draw_frame(self._frames[self._index], self.x, self.y)
+        else:
+            self._display.bitmap_tile(self._gif.bitmap, getattr(self._gif, "palette", None),
+                                      self.x, self.y, self._xb, self._yb, self._w, self._h)
+
+    def play(self, loops=1, fill=None, callback=None):
+        """
+        Plays the gif, drawing each frame ahead of time and showing it when it's due.  A frame
+        is dropped (not drawn or shown) if it's already a whole frame late, so playback keeps
+        to time when drawing can't keep up.  Timing is collected in the stats FrameStats.
+
+        :param loops: number of times to play all the frames
+        :param fill: if a color, BLING is filled with it before each frame is drawn
+        :param callback: if not None, called with this player before each frame, for example
+                         to move x,y
+        """
+        for wait in self._play(loops, fill, callback):
+            if wait > 0:
+                time.sleep(wait)
+
+    async def play_async(self, loops=1, fill=None, callback=None):
+        """Same as play(), but waits with asyncio so other tasks run between frames"""
+        import asyncio
+        for wait in self._play(loops, fill, callback):
+            await asyncio.sleep(max(0, wait))
+
+    def _play(self, loops, fill, callback):
+        """
+        Generator that does the work of play(), yielding how long to wait before each show,
+        and at the end how long the last frame still has to stay up
+        """
+        display = self._display
+        stats = self.stats
+        deadline = time.monotonic()
+        for _ in range(loops * self.frame_count):
+            start = time.monotonic()
+            delay = self.advance()
+            if callback is not None:
+                callback(self)
+            if time.monotonic() > deadline + delay:
+                stats.dropped += 1
+                deadline += delay
+                continue
+            if fill is not None:
+                display.fill(fill)
+            self.draw()
+            before = time.monotonic()
+            yield deadline - before
+            after = time.monotonic()
+            display.present()
+            now = time.monotonic()
+            stats.frame_shown(now, after - deadline, now - start - (after - before))
+            deadline += delay
+        # The last frame stays up for its delay too, so a gif played again starts on time
+        yield deadline - time.monotonic()
+
+    def deinit(self):
+        """Releases the gif and cached frames"""
+        self._frames = None
+        self._gif.deinit()
+
+
+class FrameStats(object):
+    """
+    Frame timing measurements, kept by Animator and GifPlayer.
+
+    shown, dropped and late (more than late_threshold seconds after the deadline) count
+    frames, max_late is the worst lateness and worst_frame_time the longest time spent
+    drawing and showing one frame (both in seconds).  fps and jitter (standard deviation of
+    the time between frames, in seconds) are worked out from the frames shown.
+    """
+
+    def __init__(self, late_threshold=0.002):
+        self.late_threshold = late_threshold
+        self.reset()
+
+    def reset(self):
+        """Zeros all the measurements"""
+        self.shown = 0
+        self.dropped = 0
+        self.late = 0
+        self.max_late = 0
+        self.worst_frame_time = 0
+        self._first = None
+        self._last = None
+        self._interval_sum = 0
+        self._interval_squares = 0
+
+    def frame_shown(self, shown_at, lateness, frame_time):
+        """
+        Records a frame shown at time shown_at (time.monotonic()), lateness seconds after its
+        deadline (negative or 0 if on time), having taken frame_time seconds of work.
+        """
+        if self._first is None:
+            self._first = shown_at
+        else:
+            interval = shown_at - self._last
+            self._interval_sum += interval
+            self._interval_squares += interval * interval
+        self._last = shown_at
+        self.shown += 1
+        if lateness > self.late_threshold:
+            self.late += 1
+            self.max_late = max(self.max_late, lateness)
+        self.worst_frame_time = max(self.worst_frame_time, frame_time)
+
+    @property
+    def fps(self):
+        """Returns the achieved frames per second"""
+        if self.shown < 2 or self._last == self._first:
+            return 0
+        return (self.shown - 1) / (self._last - self._first)
+
+    @property
+    def jitter(self):
+        """Returns the standard deviation of the time between frames, in seconds"""
+        intervals = self.shown - 1
+        if intervals < 1:
+            return 0
+        mean = self._interval_sum / intervals
+        return math.sqrt(max(0, self._interval_squares / intervals - mean * mean))
+
+    def __str__(self):
+        return "{:.1f} fps, jitter {:.1f}ms, worst frame {:.1f}ms, {} shown, {} dropped, {} late (worst {:.1f}ms)".format(
+            self.fps, self.jitter*1000, self.worst_frame_time*1000, self.shown, self.dropped, self.late,
+            self.max_late*1000)
+
+
+class Animator(object):
+    """
+    Runs a render function at a fixed frame rate on BLING, instead of timing and sleeping by
+    hand in every animation loop.
+
+    Frame n is due at n/fps seconds after the start.  Each frame is drawn ahead of its
+    deadline and shown when it's due, so drawing and showing time is taken out of the wait.
+    If the animation falls a whole frame or more behind, the missed frames are skipped (the
+    frame number jumps ahead) so it keeps to time, unless skip_frames is False.
+
+    :param display: BLING display object
+    :param fps: target frames per second
+    :param skip_frames: if True, skip frames to catch up when running behind
+    """
+
+    def __init__(self, display, fps=30, skip_frames=True):
+        self._display = display
+        self.fps = fps
+        self.skip_frames = skip_frames
+        self.stats = FrameStats()
+
+    def run(self, render, frames=None, duration=None):
+        """
+        Calls render(frame) for each frame and shows the result when it's due.  frame is the
+        frame number counted from 0, including skipped frames, so frame/fps is the animation
+        time.  Stops when render returns False, or after the frame number or duration limit.
+
+        :param render: function that draws one frame on the display, given the frame number
+        :param frames: if not None, stop once the frame number reaches this
+        :param duration: if not None, stop after this many seconds
+        """
+        for wait in self._run(render, frames, duration):
+            if wait > 0:
+                time.sleep(wait)
+
+    async def run_async(self, render, frames=None, duration=None):
+        """Same as run(), but waits with asyncio so other tasks run between frames"""
+        import asyncio
+        for wait in self._run(render, frames, duration):
+            await asyncio.sleep(max(0, wait))
+
+    def _run(self, render, frames, duration):
+        """Generator that does the work of run(), yielding how long to wait before each show"""
+        display = self._display
+        stats = self.stats
+        period = 1 / self.fps
+        frame = 0
+        start = time.monotonic()
+        deadline = start
+        while frames is None or frame < frames:
+            if duration is not None and deadline - start >= duration:
+                break
+            work_start = time.monotonic()
+            if render(frame) is False:
+                break
+            before = time.monotonic()
+            yield deadline - before
+            after = time.monotonic()
+            display.present()
+            now = time.monotonic()
+            stats.frame_shown(now, after - deadline, now - work_start - (after - before))
+            frame += 1
+            deadline += period
+            if self.skip_frames and now - deadline >= period:
+                missed = int((now - deadline) / period)
+                frame += missed
+                deadline += missed * period
+                stats.dropped += missed
+
+
+class _LayerBuffer(FrameBuffer):
+    """
+    A Layer's FrameBuffer, which keeps the bounding box of everything written to it as
+    (x0, y0, x1, y1) in the grid of Neopixels (40 wide for one BLING, the same in every
+    rotation), or None if nothing has been written since bounds was last reset.
+    """
+
+    def __init__(self, num_pixels, grid_width):
+        FrameBuffer.__init__(self, num_pixels)
+        self._grid_width = grid_width
+        self.bounds = None
+
+    def touched(self, first, last):
+        grid_width = self._grid_width
+        y0 = first // grid_width
+        y1 = last // grid_width + 1
+        if y1 - y0 == 1:
+            x0 = first % grid_width
+            x1 = last % grid_width + 1
+        else:
+            x0, x1 = 0, grid_width
+        bounds = self.bounds
+        if bounds is None:
+            self.bounds = (x0, y0, x1, y1)
+        else:
+            self.bounds = (min(bounds[0], x0), min(bounds[1], y0), max(bounds[2], x1), max(bounds[3], y1))
+        self.dirty = True
+
+    def __setitem__(self, index, color):
+        FrameBuffer.__setitem__(self, index, color)
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(self._num_pixels)
+            if stop > start:
+                self.touched(start, stop-1)
+        else:
+            self.touched(index, index)
+
+    def fill(self, color):
+        FrameBuffer.fill(self, color)
+        self.touched(0, self._num_pixels-1)
+
+
+def _union(a, b):
+    """Returns the bounding box of two x0,y0,x1,y1 boxes, either of which can be None"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+class Layer(object):
+    """
+    One layer of a Compositor.  Its render function draws the layer with the usual display
+    drawing functions, and the result is kept in the layer's own FrameBuffer.  render is only
+    called again once the layer is marked dirty, so a static background is drawn just once.
+
+    :param render: function taking the display object, that draws this layer
+    :param z: stacking order, higher layers are drawn over lower ones
+    :param transparent: color that lets the layers below show through, or None for an opaque layer
+    """
+
+    def __init__(self, render, z=0, transparent=0x000000):
+        self.render = render
+        self._z = z
+        self._transparent = transparent
+        self._visible = True
+        self.dirty = True
+        self.buffer = None
+        # (start, stop) runs of Neopixel indexes this layer covers, found when it is rendered
+        self._runs = []
+        self._changed = True
+        # _full asks for the next render to start from a fresh buffer, _region is the box
+        # changed by renders since the last composite
+        self._full = True
+        self._region = None
+
+    @property
+    def z(self):
+        """Stacking order of the layer, higher layers are drawn over lower ones"""
+        return self._z
+
+    @z.setter
+    def z(self, value):
+        self._z = value
+        self._changed = True
+
+    @property
+    def visible(self):
+        """If False the layer is left out of the composite, without rendering it again"""
+        return self._visible
+
+    @visible.setter
+    def visible(self, value):
+        self._visible = value
+        self._changed = True
+
+    @property
+    def transparent(self):
+        """Color that lets the layers below show through, or None for an opaque layer"""
+        return self._transparent
+
+    @transparent.setter
+    def transparent(self, value):
+        self._transparent = value
+        self.dirty = True
+        self._full = True
+
+    def invalidate(self):
+        """Marks the layer to be rendered again before the next composite"""
+        self.dirty = True
+
+    def _render(self, display):
+        """
+        Renders the layer into its buffer and works out which pixels it covers.  Only the box
+        that was drawn on, this time or last time, is cleared and scanned again, and that box
+        is kept in _region for the compositor (None after a full render, which sets _changed).
+        """
+        num_pixels = display.num_pixels
+        grid_width = display._width
+        fill = 0 if self._transparent is None else self._transparent
+        buffer = self.buffer
+        full = buffer is None or len(buffer) != num_pixels or self._full
+        if full:
+            buffer = self.buffer = _LayerBuffer(num_pixels, grid_width)
+            buffer.fill(fill)
+            region = (0, 0, grid_width, num_pixels // grid_width)
+        else:
+            # Clear what was drawn last time, and no more
+            region = buffer.bounds
+            if region is not None:
+                x0, y0, x1, y1 = region
+                packed = _rgb_bytes(fill) * (x1-x0)
+                for row in range(y0, y1):
+                    buffer.buf[3*(row*grid_width+x0):3*(row*grid_width+x1)] = packed
+        buffer.bounds = None
+        # Draw into the layer's buffer instead of BLING
+        matrix = display._matrix
+        display._matrix = buffer
+        try:
+            self.render(display)
+        finally:
+            display._matrix = matrix
+        region = _union(region, buffer.bounds)
+        if self._transparent is None:
+            self._runs = [(0, num_pixels)]
+        elif region is not None:
+            key = _rgb_bytes(self._transparent)
+            buf = buffer.buf
+            x0, y0, x1, y1 = region
+            for row in range(y0, y1):
+                first = row*grid_width + x0
+                last = row*grid_width + x1
+                runs = []
+                start = None
+                for i in range(first, last):
+                    if buf[3*i:3*i+3] != key:
+                        if start is None:
+                            start = i
+                    elif start is not None:
+                        runs.append((start, i))
+                        start = None
+                if start is not None:
+                    runs.append((start, last))
+                self._runs = _replace_runs(self._runs, first, last, runs)
+        self.dirty = False
+        self._full = False
+        if full:
+            self._changed = True
+            self._region = None
+        else:
+            self._region = _union(self._region, region)
+
+
+def _replace_runs(runs, start, stop, new):
+    """
+    Returns sorted (start, stop) runs with the part between start and stop replaced by the
+    runs in new, joining runs that touch
+    """
+    before = []
+    after = []
+    for a, b in runs:
+        if a < start:
+            before.append((a, min(b, start)))
+        if b > stop:
+            after.append((max(a, stop), b))
+    result = []
+    for run in before + new + after:
+        if result and result[-1][1] == run[0]:
+            result[-1] = (result[-1][0], run[1])
+        else:
+            result.append(run)
+    return result
+
+
+class Compositor(object):
+    """
+    A stack of Layers drawn onto BLING.  compose() renders only the layers marked dirty, then
+    copies the covered pixels of every visible layer, bottom to top, into one buffer that is
+    written to BLING in a single pass.  When nothing has changed nothing is done at all, and
+    when only some layers were re-rendered just the box they drew on is composited and written,
+    so a dashboard with a static background only pays for the overlay that changes.
+
+    The compositor owns the whole display: anything drawn outside of a layer's render function
+    is overwritten by the next composite.
+
+    :param display: BLING display object
+    """
+
+    def __init__(self, display):
+        self._display = display
+        self._layers = []
+        self._out = bytearray(3*display.num_pixels)
+        self._rotation = display.rotation
+        self._target = None
+        self._changed = True
+
+    @property
+    def layers(self):
+        """Returns the layers, bottom to top"""
+        return sorted(self._layers, key=lambda layer: layer.z)
+
+    def add(self, render, z=0, transparent=0x000000):
+        """
+        Adds a new Layer and returns it.  Layers with the same z are stacked in the order added.
+
+        :param render: function taking the display object, that draws the layer
+        :param z: stacking order, higher layers are drawn over lower ones
+        :param transparent: color that lets the layers below show through, or None for an opaque layer
+        """
+        layer = Layer(render, z, transparent)
+        self._layers.append(layer)
+        self._changed = True
+        return layer
+
+    def remove(self, layer):
+        """Takes a Layer out of the stack"""
+        self._layers.remove(layer)
+        self._changed = True
+
+    def compose(self):
+        """
+        Renders the dirty layers and, if anything changed, composites the stack onto BLING.
+        Does not show it.  Returns True if the composite changed.
+        """
+        display = self._display
+        if display.rotation != self._rotation:
+            # Layer buffers are in Neopixel index order, so they have to be drawn again
+            self._rotation = display.rotation
+            for layer in self._layers:
+                layer.dirty = True
+        changed = self._changed
+        region = None
+        for layer in self._layers:
+            if layer.dirty:
+                layer._render(display)
+            if layer._changed:
+                layer._changed = False
+                changed = True
+            if layer._region is not None:
+                if layer.visible:
+                    region = _union(region, layer._region)
+                layer._region = None
+        self._changed = False
+        out = self._out
+        num_pixels = display.num_pixels
+        if changed:
+            spans = [(0, num_pixels)]
+        elif region is not None:
+            # Only the box the re-rendered layers drew on, a row at a time unless it's full width
+            grid_width = display._width
+            x0, y0, x1, y1 = region
+            if x1 - x0 == grid_width:
+                spans = [(y0*grid_width, y1*grid_width)]
+            else:
+                spans = [(row*grid_width + x0, row*grid_width + x1) for row in range(y0, y1)]
+        else:
+            spans = []
+        layers = self.layers
+        for first, last in spans:
+            out[3*first:3*last] = bytes(3*(last-first))
+            for layer in layers:
+                if layer.visible:
+                    buf = layer.buffer.buf
+                    for start, stop in layer._runs:
+                        if start >= last:
+                            break
+                        if stop > first:
+                            start = max(start, first)
+                            stop = min(stop, last)
+                            out[3*start:3*stop] = buf[3*start:3*stop]
+        # When double buffered the buffer being drawn on changes with every swap
+        if changed or display._matrix is not self._target:
+            display._write_rgb(0, out, 0, num_pixels)
+            self._target = display._matrix
+        else:
+            for first, last in spans:
+                display._write_rgb(first, out, 3*first, last-first)
+        return changed or bool(spans)
+
+    def show(self):
+        """compose() and, if the composite changed, present() it.  Returns True if BLING was updated."""
+        if self.compose():
+            return self._display.present()
+        return False
@@ -0,0 +1,558 @@
+# Headless benchmarks for the BLING display helper, for desktop Python.
+#
+# Runs BLING.display against a stand-in Neopixel object that counts pixel writes, so the
+# speed of the drawing code can be compared between changes without any hardware.  The
+# fonts, bmps and gifs in this repository are used as test data.  Modules that only exist
+# on CircuitPython (neopixel, fontio, gifio) are replaced with small stand-ins.
+#
+# From the top of the repository:
+#
+#   python bench/bench_bling.py --output bench_results.json
+#   python bench/bench_bling.py --baseline bench_results.json
+#
+# The numbers are desktop CPython numbers: use them to compare versions of BLING.py on the
+# same machine, not to predict frame rates on a microcontroller.
+
+import argparse
+import collections
+import inspect
+import json
+import os
+import platform
+import struct
+import sys
+import time
+import types
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MockNeoPixel(object):
+    """
+    Stands in for neopixel.NeoPixel.  Keeps colors in a list and counts how many times it is
+    written to (calls) and how many pixels those writes covered (writes).
+    """
+
+    def __init__(self, pin, n, *, bpp=3, brightness=1.0, auto_write=True, pixel_order=None):
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self._pixels = [(0, 0, 0)] * n
+        self.calls = 0
+        self.writes = 0
+        self.shows = 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, value):
+        self.calls += 1
+        if isinstance(index, slice):
+            indexes = range(*index.indices(self.n))
+            if isinstance(value, (int, tuple)):
+                value = [value] * len(indexes)
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                value = [tuple(value[i:i+3]) for i in range(0, len(value), 3)]
+            for i, color in zip(indexes, value):
+                self._pixels[i] = color
+            self.writes += len(indexes)
+        else:
+            self._pixels[index] = value
+            self.writes += 1
+
+    def fill(self, color):
+        self.calls += 1
+        self.writes += self.n
+        self._pixels = [color] * self.n
+
+    def show(self):
+        self.shows += 1
+
+    def reset_counts(self):
+        self.calls = 0
+        self.writes = 0
+        self.shows = 0
+
+
+class Bitmap(object):
+    """A displayio.Bitmap stand-in, indexed by [x,y] or [i]"""
+
+    def __init__(self, width, height, value_count=256):
+        self.width = width
+        self.height = height
+        self._data = [0] * (width * height)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            return self._data[index[0] + index[1] * self.width]
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            self._data[index[0] + index[1] * self.width] = value
+        else:
+            self._data[index] = value
+
+
+def load_bmp(filename):
+    """Loads an uncompressed 8 bit .bmp into a Bitmap and a list of colors"""
+    with open(filename, "rb") as bmp:
+        data = bmp.read()
+    data_start, header_size, width, height = struct.unpack("<I I i i", data[10:26])
+    bits, compression, _, _, _, colors = struct.unpack("<H I I i i I", data[28:50])
+    if bits != 8 or compression != 0:
+        raise ValueError("Only uncompressed 8 bit bmps are supported")
+    colors = colors or 256
+    palette = []
+    for i in range(14 + header_size, 14 + header_size + 4*colors, 4):
+        palette.append((data[i+2] << 16) | (data[i+1] << 8) | data[i])
+    bitmap = Bitmap(width, abs(height))
+    line_size = (width + 3) & ~3
+    for row in range(abs(height)):
+        y = abs(height) - 1 - row if height > 0 else row
+        start = data_start + row*line_size
+        for x in range(width):
+            bitmap[x, y] = data[start + x]
+    return bitmap, palette
+
+
+class OnDiskGif(object):
+    """
+    Stands in for gifio.OnDiskGif.  Frames are decoded up front into RGB565_Swapped values,
+    like gifio gives you, and next_frame() just copies the next one into .bitmap
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as gif:
+            data = gif.read()
+        if data[:6] not in (b"GIF87a", b"GIF89a"):
+            raise ValueError("Not a gif")
+        self.width, self.height, flags = struct.unpack("<HHB", data[6:11])
+        pos = 13
+        colors = []
+        if flags & 0x80:
+            size = 3 << ((flags & 0x07) + 1)
+            colors = self._rgb565_swapped(data[pos:pos+size])
+            pos += size
+        indexes = [0] * (self.width * self.height)
+        self._frames = []
+        self._delays = []
+        delay = 0.1
+        while pos < len(data) and data[pos] != 0x3B:
+            block = data[pos]
+            pos += 1
+            if block == 0x21:
+                label = data[pos]
+                pos += 1
+                if label == 0xF9:
+                    delay = struct.unpack("<H", data[pos+2:pos+4])[0] / 100
+                while data[pos]:
+                    pos += data[pos] + 1
+                pos += 1
+            elif block == 0x2C:
+                left, top, width, height, frame_flags = struct.unpack("<HHHHB", data[pos:pos+9])
+                pos += 9
+                frame_colors = colors
+                if frame_flags & 0x80:
+                    size = 3 << ((frame_flags & 0x07) + 1)
+                    frame_colors = self._rgb565_swapped(data[pos:pos+size])
+                    pos += size
+                code_size = data[pos]
+                pos += 1
+                stream = bytearray()
+                while data[pos]:
+                    stream += data[pos+1:pos+1+data[pos]]
+                    pos += data[pos] + 1
+                pos += 1
+                pixels = self._lzw(stream, code_size)
+                for i in range(min(len(pixels), width*height)):
+                    indexes[left + i % width + (top + i // width) * self.width] = pixels[i]
+                self._frames.append([frame_colors[i] if i < len(frame_colors) else 0 for i in indexes])
+                self._delays.append(delay)
+            else:
+                raise ValueError("Bad gif block")
+        self.frame_count = len(self._frames)
+        self.bitmap = Bitmap(self.width, self.height)
+        self._next = 0
+
+    @staticmethod
+    def _rgb565_swapped(rgb):
+        colors = []
+        for i in range(0, len(rgb), 3):
+            value = ((rgb[i] & 0xF8) << 8) | ((rgb[i+1] & 0xFC) << 3) | (rgb[i+2] >> 3)
+            colors.append(((value & 0xFF) << 8) | (value >> 8))
+        return colors
+
+    @staticmethod
+    def _lzw(data, code_size):
+        clear = 1 << code_size
+        end = clear + 1
+        table = [bytes([i]) for i in range(clear)] + [b"", b""]
+        width = code_size + 1
+        out = bytearray()
+        previous = None
+        bits = 0
+        count = 0
+        for byte in data:
+            bits |= byte << count
+            count += 8
+            while count >= width:
+                code = bits & ((1 << width) - 1)
+                bits >>= width
+                count -= width
+                if code == clear:
+                    table = table[:end+1]
+                    width = code_size + 1
+                    previous = None
+                    continue
+                if code == end:
+                    return out
+                if code < len(table):
+                    entry = table[code]
+                    if previous is not None:
+                        table.append(previous + entry[:1])
+                else:
+                    entry = previous + previous[:1]
+                    table.append(entry)
+                out += entry
+                previous = entry
+                if len(table) == 1 << width and width < 12:
+                    width += 1
+        return out
+
+    def next_frame(self):
+        self.bitmap._data[:] = self._frames[self._next]
+        delay = self._delays[self._next]
+        self._next = (self._next + 1) % self.frame_count
+        return delay
+
+    def deinit(self):
+        self._frames = None
+
+
+def install_stand_ins():
+    """
+    Puts the stand-in modules in place and imports BLING.  Returns (BLING, bitmap_font), where
+    bitmap_font is None if adafruit_bitmap_font isn't installed.
+    """
+    neopixel = types.ModuleType("neopixel")
+    neopixel.NeoPixel = MockNeoPixel
+    neopixel.RGB = "RGB"
+    neopixel.GRB = "GRB"
+    sys.modules["neopixel"] = neopixel
+    gifio = types.ModuleType("gifio")
+    gifio.OnDiskGif = OnDiskGif
+    sys.modules["gifio"] = gifio
+    try:
+        import fontio
+    except ImportError:
+        fontio = types.ModuleType("fontio")
+        fontio.Glyph = collections.namedtuple(
+            "Glyph", ["bitmap", "tile_index", "width", "height", "dx", "dy", "shift_x", "shift_y"])
+        sys.modules["fontio"] = fontio
+    try:
+        from adafruit_bitmap_font import bitmap_font
+    except ImportError:
+        bitmap_font = None
+        package = types.ModuleType("adafruit_bitmap_font")
+        package.__path__ = []
+        for name, cls in (("bdf", "BDF"), ("pcf", "PCF")):
+            module = types.ModuleType("adafruit_bitmap_font." + name)
+            setattr(module, cls, type(cls, (object,), {}))
+            setattr(package, name, module)
+            sys.modules[module.__name__] = module
+        sys.modules["adafruit_bitmap_font"] = package
+    sys.path.insert(0, REPO)
+    import BLING
+    return BLING, bitmap_font
+
+
+def load_font(bitmap_font, filename):
+    try:
+        from displayio import Bitmap as font_bitmap
+    except ImportError:
+        font_bitmap = Bitmap
+    return bitmap_font.load_font(filename, font_bitmap)
+
+
+def benchmarks(BLING, assets):
+    """
+    Returns the benchmarks as (name, setup, options) tuples.  setup(display) is called once
+    per rotation, on a display made with the extra constructor arguments in options, and
+    returns the operation to time, or None to skip it.  The "panels" option is (boards,
+    columns) for a wall of boards chained on one Neopixel strip, drawn on through BLING.Panels.
+
+    Benchmarks skip themselves when the BLING.py being measured doesn't have what they use,
+    so older versions can be run to get a baseline.
+    """
+    bin_font = os.path.join(REPO, "fonts", "font5x8.bin")
+    image, palette = assets["wow"]
+
+    def has(d, *names):
+        return all(hasattr(d, name) for name in names)
+
+    def fill(d):
+        return lambda: d.fill((0, 0, 40))
+
+    def setpixel(d):
+        return lambda: d.setpixel(3, 4, (255, 0, 0))
+
+    def hline(d):
+        return lambda: d.hline(0, 3, d.width, (0, 255, 0))
+
+    def vline(d):
+        return lambda: d.vline(3, 0, d.height, (0, 255, 0))
+
+    def fill_rect(d):
+        return lambda: d.fill_rect(2, 1, 10, 6, (0, 0, 255))
+
+    def wipe(d):
+        # Rows as wide as BLING, which join up into one run of Neopixels for rotation 0,2
+        return lambda: d.fill_rect(0, 2, d.width, 4, (0, 0, 255))
+
+    def rect(d):
+        return lambda: d.rect(1, 1, 12, 6, (0, 0, 255))
+
+    def line(d):
+        return lambda: d.line(0, 0, d.width-1, d.height-1, (255, 255, 0))
+
+    def polyline(d):
+        if not has(d, "polyline"):
+            return None
+        # A waveform that runs off the top and bottom, so clipping gets used too
+        points = [(x, (x * 7) % 13 - 2) for x in range(0, d.width, 3)]
+        return lambda: d.polyline(points, (255, 255, 0))
+
+    def circle(d):
+        return lambda: d.circle(4, 4, 3, (255, 0, 255))
+
+    def fill_circle(d):
+        if not has(d, "fill_circle"):
+            return None
+        return lambda: d.fill_circle(4, 4, 4, (255, 0, 255))
+
+    def fill_ellipse(d):
+        if not has(d, "fill_ellipse"):
+            return None
+        return lambda: d.fill_ellipse(6, 4, 5, 3, (255, 0, 255))
+
+    def round_rect(d):
+        if not has(d, "round_rect"):
+            return None
+        return lambda: d.round_rect(0, 0, 12, 8, 3, (0, 255, 255))
+
+    def text_bin(d):
+        return lambda: d.text("Bling!", bin_font, 1, 0, (255, 0, 0), (0, 0, 0))
+
+    def text_pcf(d):
+        if assets["pcf"] is None:
+            return None
+        return lambda: d.text("Bling!", assets["pcf"], 1, 0, (255, 0, 0), (0, 0, 0))
+
+    def text_bdf(d):
+        if assets["bdf"] is None:
+            return None
+        return lambda: d.text("Bling!", assets["bdf"], 1, 0, (255, 0, 0))
+
+    def strip(d):
+        if not has(d, "text_strip", "strip"):
+            return None
+        text_strip = d.text_strip("Breaking news from BLING", bin_font, (0, 255, 0), (0, 0, 0))
+        return lambda: d.strip(text_strip, -13, 0)
+
+    def bitmap_tile(d):
+        return lambda: d.bitmap_tile(image, palette, 0, 0, 20, 4, 40, 8)
+
+    def draw_frame(d):
+        if not has(d, "prerender", "draw_frame"):
+            return None
+        frame = d.prerender(image, palette, 20, 4, 40, 8)
+        return lambda: d.draw_frame(frame, 0, 0)
+
+    def replay(d):
+        if not has(d, "record", "replay"):
+            return None
+        d.record()
+        d.text("Hi", bin_font, 0, 0, (255, 0, 0))
+        d.circle(15, 4, 3, (0, 255, 0))
+        display_list = d.end_record()
+        return lambda: d.replay(display_list, 2, 0)
+
+    def scroll(d):
+        if not has(d, "scroll"):
+            return None
+        return lambda: d.scroll(1, 0, (0, 0, 0))
+
+    def gif_frame(d):
+        if assets["gif"] is None or not has(BLING, "GifPlayer"):
+            return None
+        player = BLING.GifPlayer(d, assets["gif"])
+        def op():
+            player.advance()
+            player.draw()
+        return op
+
+    def show_framebuffer(d):
+        # A changed frame copied out of the framebuffer and shown
+        colors = [(255, 0, 0), (0, 255, 0)]
+        def op():
+            colors.reverse()
+            d.setpixel(0, 0, colors[0])
+            d.show()
+        return op
+
+    def show_corrected(d):
+        if not has(d, "set_correction"):
+            return None
+        # The same, with gamma and brightness tables applied on the way out
+        d.set_correction(gamma=2.2, brightness=0.5)
+        return show_framebuffer(d)
+
+    return [(setup.__name__, setup, {}) for setup in (
+        fill, setpixel, hline, vline, fill_rect, wipe, rect, line, polyline, circle, fill_circle, fill_ellipse,
+        round_rect, text_bin, text_pcf,
+        text_bdf, strip, bitmap_tile, draw_frame, replay, scroll, gif_frame)] + [
+        ("show_framebuffer", show_framebuffer, {"framebuffer": True}),
+        ("show_corrected", show_corrected, {"framebuffer": True}),
+        ("fill_rect_framebuffer", fill_rect, {"framebuffer": True}),
+        ("wall_fill_rect", fill_rect, {"panels": (4, 2)}),
+        ("wall_text_bin", text_bin, {"panels": (4, 2)}),
+        ("wall_show_framebuffer", show_framebuffer, {"panels": (4, 2), "framebuffer": True})]
+
+
+def measure(op, min_time, repeat):
+    """Returns the best ops per second of repeat runs, each at least min_time seconds long"""
+    best = 0
+    for _ in range(repeat):
+        count = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(count):
+                op()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+            count *= 2
+        best = max(best, count / elapsed)
+    return best
+
+
+def run(BLING, assets, rotations, only, min_time, repeat):
+    results = {}
+    for name, setup, options in benchmarks(BLING, assets):
+        if only and not any(part in name for part in only):
+            continue
+        options = dict(options)
+        boards, columns = options.pop("panels", (1, 1))
+        # Skip what the BLING.py being measured can't be set up for
+        if boards > 1 and not hasattr(BLING, "Panels"):
+            continue
+        if not all(option in inspect.signature(BLING.display).parameters for option in options):
+            continue
+        for rotation in rotations:
+            pixels = MockNeoPixel(None, 320 * boards, auto_write=False)
+            if boards > 1:
+                d = BLING.display(BLING.Panels(pixels, columns), rotation=rotation, **options)
+            else:
+                d = BLING.display(pixels, rotation=rotation, **options)
+            op = setup(d)
+            if op is None:
+                continue
+            op()  # warm up caches, so the counts below are for the steady state
+            pixels.reset_counts()
+            op()
+            counts = {"calls": pixels.calls, "pixel_writes": pixels.writes}
+            results.setdefault(name, {})[str(rotation)] = {
+                "ops_per_sec": round(measure(op, min_time, repeat), 1),
+                "pixel_writes_per_call": counts["pixel_writes"],
+                "neopixel_calls_per_call": counts["calls"],
+            }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of regression messages against the baseline results"""
+    regressions = []
+    for name, rotations in sorted(results.items()):
+        for rotation, result in sorted(rotations.items()):
+            old = baseline.get(name, {}).get(rotation)
+            if old is None:
+                continue
+            if result["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+                regressions.append("{} rotation {}: {:.0f} ops/s, was {:.0f}".format(
+                    name, rotation, result["ops_per_sec"], old["ops_per_sec"]))
+            if result["pixel_writes_per_call"] > old["pixel_writes_per_call"]:
+                regressions.append("{} rotation {}: {} pixel writes per call, was {}".format(
+                    name, rotation, result["pixel_writes_per_call"], old["pixel_writes_per_call"]))
+    return regressions
+
+
+def report(results, baseline):
+    print("{:<21} {:>3} {:>12} {:>8} {:>7} {:>9}".format(
+        "benchmark", "rot", "ops/s", "writes", "calls", "vs base"))
+    for name, rotations in results.items():
+        for rotation, result in sorted(rotations.items()):
+            change = ""
+            old = baseline.get(name, {}).get(rotation) if baseline else None
+            if old:
+                change = "{:+.1f}%".format(100 * (result["ops_per_sec"] / old["ops_per_sec"] - 1))
+            print("{:<21} {:>3} {:>12.1f} {:>8} {:>7} {:>9}".format(
+                name, rotation, result["ops_per_sec"], result["pixel_writes_per_call"],
+                result["neopixel_calls_per_call"], change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks for BLING.py")
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fractional slowdown against the baseline that counts as a regression")
+    parser.add_argument("--rotations", default="0,1,2,3", help="comma separated rotations to run")
+    parser.add_argument("--only", action="append", help="only run benchmarks with this in their name")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timing run")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per benchmark, the best is kept")
+    args = parser.parse_args()
+
+    BLING, bitmap_font = install_stand_ins()
+    assets = {
+        "wow": load_bmp(os.path.join(REPO, "bmps", "wow.bmp")),
+        "gif": os.path.join(REPO, "gifs", "blinka-172x40.gif"),
+        "pcf": None,
+        "bdf": None,
+    }
+    if bitmap_font is not None:
+        assets["pcf"] = load_font(bitmap_font, os.path.join(REPO, "fonts", "5x8.pcf"))
+        assets["bdf"] = load_font(bitmap_font, os.path.join(REPO, "fonts", "lemon.bdf"))
+    else:
+        print("adafruit_bitmap_font is not installed, skipping the PCF/BDF benchmarks")
+
+    rotations = [int(r) for r in args.rotations.split(",")]
+    results = run(BLING, assets, rotations, args.only, args.min_time, args.repeat)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({
+                "python": sys.version,
+                "platform": platform.platform(),
+                "results": results,
+            }, output, indent=1, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,6 @@ import math
 from adafruit_pixel_framebuf import PixelFramebuffer
 import math
 import adafruit_imageload
-import gifio
 import BLING
 import random
 import rainbowio
@@ -88,28 +87,19 @@ def gif_demo(rounds=4):
         ]
     for choice in choices:
         print("GIF",choice)
-        odg = gifio.OnDiskGif(GIFS+choice)
-        f=0
-        p=0
-        dir=1
-        play_gif = True
-        while(play_gif):
-            start = time.monotonic()
-            next_delay = odg.next_frame()
-            the_bling.fill((0,0,0))
-            the_bling.bitmap_tile(odg.bitmap,odg.palette,0,-p,0,0,40,22)
-            the_bling.show()
-            end = time.monotonic()
-            overhead = end-start
-
-            p += dir
-            if p == 11 or p == 0:
-                dir = -dir
-            time.sleep(max(0, next_delay-overhead))
-            f += 1
-            if f > odg.frame_count * rounds:
-                play_gif = False
-                odg.deinit()
+        # GifPlayer decodes each frame once (if they fit in memory) and keeps to the gif's timing
+        player = BLING.GifPlayer(the_bling, GIFS+choice)
+        pan = {"p": 0, "dir": 1}
+
+        def pan_gif(player):
+            player.y = -pan["p"]
+            pan["p"] += pan["dir"]
+            if pan["p"] == 11 or pan["p"] == 0:
+                pan["dir"] = -pan["dir"]
+
+        player.play(loops=rounds, fill=(0,0,0), callback=pan_gif)
+        print("GIF",choice,player.stats)
+        player.deinit()
 
 def image_demo():
     """
@@ -117,10 +107,11 @@ def image_demo():
     """
     print("Sparkles from tile")
     image, palette = adafruit_imageload.load("bmps/wow.bmp")
+    sparkles = BLING.SpriteSheet(the_bling, image, palette, 40, 32, step_x=20)
     for q in range(5):
         for f in range(8):
             the_bling.fill((0,0,0))
-            the_bling.bitmap_tile(image, palette,0,-f,20*f,0,40,32)
+            sparkles.draw(f,0,-f)
             the_bling.show()
             time.sleep(0.05)
     image.deinit()
@@ -145,12 +136,13 @@ def image_demo():
         the_bling.bitmap_tile(image,palette,60-d,0,0,0,15,15)
         the_bling.show()
         time.sleep(0.01)
-    for q in range(5):
-        for f in range(13):
-            the_bling.fill((0,0,0))
-            the_bling.bitmap_tile(image, palette,0,0,16*f,0,16,8)
-            the_bling.show()
-            time.sleep(0.05)
+    catjam = BLING.Sprite(BLING.SpriteSheet(the_bling, image, palette, 16, 16), frames=range(13))
+    for q in range(5*13):
+        the_bling.fill((0,0,0))
+        catjam.draw()
+        catjam.advance()
+        the_bling.show()
+        time.sleep(0.05)
     image.deinit()
 
     print("catJAM Mono from tiled bmp")
@@ -327,9 +319,9 @@ def shapes_demo():
     """
     FONTS="/fonts/"
     font = bitmap_font.load_font(FONTS+"5x8.pcf")
-    max_w,y0,x_off,y_off = font.get_bounding_box()
     message = "Bling!"
-    max_w = max_w * len(message)
+    # The exact width, so the scroll stops as soon as the message is off the display
+    max_w = the_bling.measure_text(message,font).width
 
     the_bling.fill(0x000000)
     the_bling.line(0,0,39,7,(255,0,0))
@@ -430,6 +422,14 @@ def shapes_demo():
             j+=1
         the_bling.circle(x0,y0,i,(0,0,0))
 
+    for i in range(1,15):
+        the_bling.fill(0x00000)
+        the_bling.fill_circle(8,4,i,rainbowio.colorwheel(i*35))
+        the_bling.round_rect(17,0,12,8,i//3,rainbowio.colorwheel(i*35+85),fill=(i%2==0))
+        the_bling.ellipse(34,4,i//2,3,rainbowio.colorwheel(i*35+170))
+        the_bling.show()
+        time.sleep(0.1)
+
 
 def timing_test():
     """
@@ -518,10 +518,12 @@ def intro():
     FONTS="/fonts/"
     font = FONTS+"font5x8.bin"
     message = "Bling Demo"
-    max_w = 8 * len(message)
+    max_w = the_bling.measure_text(message,font).width
+    # Render the message once, then just move the window of it that's drawn
+    strip = the_bling.text_strip(message,font,color_foreground=(0,0,0))
     for i in range(2*max_w):
         the_bling.fill(rainbowio.colorwheel(i*5))
-        the_bling.text(message,font,max_w-i,0,color_foreground=(0,0,0))
+        the_bling.strip(strip,max_w-i,0)
         the_bling.show()
 
     # turn off individual pixels